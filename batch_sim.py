@@ -0,0 +1,344 @@
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+from simulation import (
+    DIFFICULTIES, PLAYER_SPECS, ENEMY_SPECS, ATTACK, SPECIAL, HEAL, DEFEND, FITNESS_WEIGHTS, Character, derive_seed
+)
+
+NO_ACTION = -1
+
+# Columns of the per-step uniform draw matrix
+(PLAYER_SPECIAL_ROLL, PLAYER_ATTACK_ROLL, PLAYER_TARGET_ROLL, PLAYER_STUN_ROLL,
+ ENEMY_HEAL_ROLL, ENEMY_SPECIAL_ROLL, ENEMY_ATTACK_ROLL, ENEMY_TARGET_ROLL, ENEMY_POISON_ROLL) = range(9)
+N_DRAWS = 9
+
+
+def _pick_alive(alive, k):
+    # Index of the k-th living member in each row
+    return np.argmax(np.cumsum(alive, axis=1) > k[:, None], axis=1)
+
+
+def _weakest(hp, max_hp, alive):
+    ratio = np.where(alive, hp / max_hp, np.inf)
+    return np.argmin(ratio, axis=1)
+
+
+def _take_damage(hp, defense, alive, rows, cols, damage):
+    actual = np.maximum(0, damage - defense[rows, cols])
+    hp[rows, cols] = np.maximum(0, hp[rows, cols] - actual)
+    alive[rows, cols] &= hp[rows, cols] != 0
+
+
+# Vectorized counterpart of Battle + evaluate_fitness: B independent battles
+# advance one evaluate_fitness turn per step(). With a BattleSnapshot as `start`
+# every battle begins from that position instead of full HP.
+class BatchBattle:
+    def __init__(self, behaviors, difficulty="Medium", rng=None, start=None):
+        self.behaviors = np.array(behaviors, dtype=np.float64)
+        self.size = self.behaviors.shape[0]
+        self.difficulty = difficulty
+        self.rng = np.random.default_rng(rng)
+        self.start = start
+
+        players = [Character(*spec) for spec in PLAYER_SPECS]
+        enemies = [Character(*spec, difficulty) for spec in ENEMY_SPECS]
+        self.p_max_hp = np.array([p.max_hp for p in players], dtype=np.float64)
+        self.p_attack = np.array([p.attack for p in players], dtype=np.float64)
+        self.p_base_defense = np.array([p.defense for p in players], dtype=np.float64)
+        self.p_heal_amount = np.array([int(20 * p.heal_effectiveness) for p in players], dtype=np.float64)
+        self.e_max_hp = np.array([e.max_hp for e in enemies], dtype=np.float64)
+        self.e_attack = np.array([e.attack for e in enemies], dtype=np.float64)
+        self.e_base_defense = np.array([e.defense for e in enemies], dtype=np.float64)
+        self.e_heal_amount = np.array([int(20 * e.heal_effectiveness) for e in enemies], dtype=np.float64)
+        self.e_goblin = np.array([e.name == "Goblin" for e in enemies])
+
+        adjust = DIFFICULTIES[difficulty]
+        self.prob_adjust = np.array([
+            adjust["attack_prob_adjust"],
+            adjust["heal_prob_adjust"],
+            0.0,
+            adjust["special_prob_adjust"]
+        ])
+        self.reset()
+
+    def reset(self):
+        b, n_players, n_enemies = self.size, len(self.p_max_hp), len(self.e_max_hp)
+        self.p_hp = np.tile(self.p_max_hp, (b, 1))
+        self.p_defense = np.tile(self.p_base_defense, (b, 1))
+        self.p_alive = np.ones((b, n_players), dtype=bool)
+        self.p_poison = np.zeros((b, n_players), dtype=np.int64)
+        self.e_hp = np.tile(self.e_max_hp, (b, 1))
+        self.e_defense = np.tile(self.e_base_defense, (b, 1))
+        self.e_alive = np.ones((b, n_enemies), dtype=bool)
+        self.e_stun = np.zeros((b, n_enemies), dtype=np.int64)
+        self.current_behaviors = self.behaviors.copy()
+        self.player_turn = np.ones(b, dtype=bool)
+        self.turn_count = np.zeros(b, dtype=np.int64)
+        self.active_player = np.zeros(b, dtype=np.int64)
+        self.active_enemy = np.zeros(b, dtype=np.int64)
+        # Last three player actions, newest in the final column
+        self.recent_actions = np.full((b, 3), NO_ACTION, dtype=np.int64)
+        # Enemy histories only ever hold attack/special, so a capped length is enough
+        self.times_targeted = np.zeros((b, n_enemies), dtype=np.int64)
+        self.action_counts = np.zeros((b, 4), dtype=np.int64)
+        self.done = np.zeros(b, dtype=bool)
+        if self.start is not None:
+            self._load(self.start)
+
+    def _load(self, snap):
+        b = self.size
+        players, enemies = snap.player_party, snap.enemy_party
+        self.p_hp[:] = np.asarray(players.hp, dtype=np.float64)
+        self.p_defense[:] = np.asarray(players.defense, dtype=np.float64)
+        self.p_alive[:] = np.asarray(players.alive, dtype=bool)
+        self.p_poison[:] = np.asarray(players.poison, dtype=np.int64)
+        self.e_hp[:] = np.asarray(enemies.hp, dtype=np.float64)
+        self.e_defense[:] = np.asarray(enemies.defense, dtype=np.float64)
+        self.e_alive[:] = np.asarray(enemies.alive, dtype=bool)
+        self.e_stun[:] = np.asarray(enemies.stun, dtype=np.int64)
+        self.player_turn[:] = snap.turn == "player"
+        self.turn_count[:] = snap.turn_count
+        self.active_player[:] = snap.active_player
+        self.active_enemy[:] = snap.active_enemy
+        recent = list(snap.player_action_history)[-3:]
+        if recent:
+            self.recent_actions[:, -len(recent):] = recent
+        self.times_targeted[:] = [len(history) for history in snap.enemy_action_history]
+
+    def is_over(self):
+        return ~self.p_alive.any(axis=1) | ~self.e_alive.any(axis=1)
+
+    def step(self, draws=None):
+        if draws is None:
+            draws = self.rng.random((self.size, N_DRAWS))
+        self.done |= self.is_over()
+        player_rows = np.nonzero(~self.done & self.player_turn)[0]
+        enemy_rows = np.nonzero(~self.done & ~self.player_turn)[0]
+        if len(player_rows):
+            self._player_step(player_rows, draws[player_rows])
+        if len(enemy_rows):
+            self._enemy_step(enemy_rows, draws[enemy_rows])
+
+    def run(self, max_turns, draws=None):
+        for turn in range(max_turns):
+            self.step(None if draws is None else draws[:, turn])
+
+    def _player_step(self, rows, u):
+        p_alive = self.p_alive[rows]
+        n_alive = p_alive.sum(axis=1)
+        actor = _pick_alive(p_alive, self.active_player[rows] % n_alive)
+
+        # Scripted opponent from evaluate_fitness
+        low_hp = (p_alive & (self.p_hp[rows] / self.p_max_hp < 0.3)).any(axis=1)
+        action = np.where(low_hp, HEAL,
+                 np.where(u[:, PLAYER_SPECIAL_ROLL] < 0.2, SPECIAL,
+                 np.where(u[:, PLAYER_ATTACK_ROLL] < 0.7, ATTACK, DEFEND)))
+        e_alive = self.e_alive[rows]
+        target = _pick_alive(e_alive, (u[:, PLAYER_TARGET_ROLL] * e_alive.sum(axis=1)).astype(np.int64))
+
+        offensive = (action == ATTACK) | (action == SPECIAL)
+        self.times_targeted[rows[offensive], target[offensive]] += 1
+        self.recent_actions[rows] = np.column_stack((self.recent_actions[rows, 1:], action))
+        self.action_counts[rows, action] += 1
+
+        hit = action == ATTACK
+        _take_damage(self.e_hp, self.e_defense, self.e_alive, rows[hit], target[hit], self.p_attack[actor[hit]])
+
+        guard = action == DEFEND
+        self.p_defense[rows[guard], actor[guard]] += 5
+
+        mend = action == HEAL
+        if mend.any():
+            r = rows[mend]
+            patient = _weakest(self.p_hp[r], self.p_max_hp, self.p_alive[r])
+            self.p_hp[r, patient] = np.minimum(self.p_max_hp[patient], self.p_hp[r, patient] + self.p_heal_amount[patient])
+
+        special = action == SPECIAL
+        stun = special & (u[:, PLAYER_STUN_ROLL] < 0.3)
+        self.e_stun[rows[stun], target[stun]] = 1
+        blast = special & ~stun
+        _take_damage(self.e_hp, self.e_defense, self.e_alive, rows[blast], target[blast], self.p_attack[actor[blast]] * 2)
+
+        self.active_player[rows] = (actor + 1) % n_alive
+        self.player_turn[rows] = False
+
+    def _enemy_step(self, rows, u):
+        e_alive = self.e_alive[rows]
+        n_alive = e_alive.sum(axis=1)
+        actor = _pick_alive(e_alive, self.active_enemy[rows] % n_alive)
+
+        a, h, threshold, s = (self.current_behaviors[rows, actor] + self.prob_adjust).T
+        a, h, s = np.clip(a, 0, 1), np.clip(h, 0, 1), np.clip(s, 0, 1)
+
+        recent = self.recent_actions[rows]
+        attack_count = ((recent == ATTACK) | (recent == SPECIAL)).sum(axis=1)
+        heal_count = (recent == HEAL).sum(axis=1)
+
+        # Goblin counter-rules take precedence over everything, including stun
+        goblin = self.e_goblin[actor]
+        g_heal = goblin & (attack_count == 3)
+        g_defend = goblin & (attack_count == 2) & ~g_heal
+        g_poison = goblin & (heal_count >= 3) & ~g_heal & ~g_defend
+        ruled = g_heal | g_defend | g_poison
+        stunned = ~ruled & (self.e_stun[rows, actor] > 0)
+        general = ~ruled & ~stunned
+
+        h = np.where(g_heal, np.minimum(1, h + 0.3), h)
+        a = np.where(g_heal, np.maximum(0, a - 0.1), a)
+        s = np.where(g_heal, np.maximum(0, s - 0.05), s)
+
+        self.e_defense[rows[g_defend], actor[g_defend]] += 5
+        a = np.where(g_defend, np.maximum(0, a - 0.1), a)
+        h = np.where(g_defend, np.minimum(1, h + 0.1), h)
+        s = np.where(g_defend, np.maximum(0, s - 0.05), s)
+
+        p_alive = self.p_alive[rows]
+        victim = _pick_alive(p_alive, (u[:, ENEMY_TARGET_ROLL] * p_alive.sum(axis=1)).astype(np.int64))
+        self.p_poison[rows[g_poison], victim[g_poison]] = 3
+        _take_damage(self.p_hp, self.p_defense, self.p_alive, rows[g_poison], victim[g_poison], self.e_attack[actor[g_poison]] * 2.5)
+        s = np.where(g_poison, np.minimum(1, s + 0.2), s)
+        a = np.where(g_poison, np.maximum(0, a - 0.1), a)
+        h = np.where(g_poison, np.maximum(0, h - 0.1), h)
+
+        # General behavior adjustments based on player actions
+        aggressive = general & (attack_count >= 2)
+        h = np.where(aggressive, np.minimum(1, h + 0.4), h)
+        threshold = np.where(aggressive, np.maximum(0.5, threshold - 0.2), threshold)
+        healing = general & (heal_count >= 2)
+        s = np.where(healing, np.minimum(1, s + 0.4), s)
+        h = np.where(healing, np.maximum(0, h - 0.1), h)
+
+        own_ratio = self.e_hp[rows, actor] / self.e_max_hp[actor]
+        consecutive_attacks = np.minimum(3, self.times_targeted[rows, actor])
+        pressured = general & (consecutive_attacks >= 3)
+        a = np.where(pressured, np.maximum(0, a - 0.3), a)
+        h = np.where(pressured, np.minimum(1, h + 0.2), h)
+        battered = general & (consecutive_attacks >= 5) & (own_ratio < 0.75)
+        h = np.where(battered, np.minimum(1, h + 0.4), h)
+        threshold = np.where(battered, np.maximum(0.5, threshold - 0.2), threshold)
+
+        total_player_hp = (self.p_hp[rows] * p_alive).sum(axis=1) / self.p_max_hp.sum()
+        killing = general & (total_player_hp < 0.3)
+        a = np.where(killing, np.minimum(1, a + 0.3), a)
+        s = np.where(killing, np.minimum(1, s + 0.3), s)
+
+        # General action decision
+        do_heal = general & (own_ratio < threshold) & (u[:, ENEMY_HEAL_ROLL] < h)
+        do_special = general & ~do_heal & (u[:, ENEMY_SPECIAL_ROLL] < s)
+        do_attack = general & ~do_heal & ~do_special & (u[:, ENEMY_ATTACK_ROLL] < a)
+        do_defend = general & ~do_heal & ~do_special & ~do_attack
+
+        mend = g_heal | do_heal
+        if mend.any():
+            r = rows[mend]
+            patient = _weakest(self.e_hp[r], self.e_max_hp, self.e_alive[r])
+            self.e_hp[r, patient] = np.minimum(self.e_max_hp[patient], self.e_hp[r, patient] + self.e_heal_amount[patient])
+        h = np.where(do_heal, np.minimum(1, h + 0.1), h)
+        a = np.where(do_heal, np.maximum(0, a - 0.05), a)
+        s = np.where(do_heal, np.maximum(0, s - 0.05), s)
+
+        poison = do_special & (u[:, ENEMY_POISON_ROLL] < 0.3)
+        self.p_poison[rows[poison], victim[poison]] = 3
+        blast = do_special & ~poison
+        _take_damage(self.p_hp, self.p_defense, self.p_alive, rows[blast], victim[blast], self.e_attack[actor[blast]] * 2.5)
+        s = np.where(do_special, np.minimum(1, s + 0.2), s)
+        a = np.where(do_special, np.maximum(0, a - 0.1), a)
+        h = np.where(do_special, np.maximum(0, h - 0.1), h)
+
+        _take_damage(self.p_hp, self.p_defense, self.p_alive, rows[do_attack], victim[do_attack], self.e_attack[actor[do_attack]])
+        a = np.where(do_attack, np.minimum(1, a + 0.1), a)
+        h = np.where(do_attack, np.maximum(0, h - 0.1), h)
+        s = np.where(do_attack, np.maximum(0, s - 0.05), s)
+
+        self.e_defense[rows[do_defend], actor[do_defend]] += 5
+        a = np.where(do_defend, np.maximum(0, a - 0.1), a)
+        h = np.where(do_defend, np.minimum(1, h + 0.1), h)
+        s = np.where(do_defend, np.maximum(0, s - 0.05), s)
+
+        # Additional probability adjustment if the enemy healed
+        h = np.where(mend, np.minimum(1, h + 0.1), h)
+        a = np.where(mend, np.maximum(0, a - 0.05), a)
+        s = np.where(mend, np.maximum(0, s - 0.05), s)
+
+        self.current_behaviors[rows, actor] = np.column_stack((
+            np.clip(a, 0, 1), np.clip(h, 0, 1), threshold, np.clip(s, 0, 1)
+        ))
+
+        self.active_enemy[rows] = (actor + 1) % n_alive
+        self.player_turn[rows] = True
+        self.turn_count[rows] += 1
+        self._update_status(rows)
+
+    def _update_status(self, rows):
+        poisoned = self.p_poison[rows] > 0
+        r, c = np.nonzero(poisoned)
+        _take_damage(self.p_hp, self.p_defense, self.p_alive, rows[r], c, 5)
+        self.p_poison[rows] -= poisoned
+        self.e_stun[rows] -= self.e_stun[rows] > 0
+        self.p_defense[rows] = np.maximum(5, self.p_defense[rows] - 5)
+        self.e_defense[rows] = np.maximum(3, self.e_defense[rows] - 5)
+
+    # (B, 5) array of the simulation.OBJECTIVES for every battle
+    def objectives(self):
+        player_hp = (self.p_hp * self.p_alive).sum(axis=1)
+        enemy_hp = (self.e_hp * self.e_alive).sum(axis=1)
+        duration_score = np.abs(self.turn_count - 10) / 10
+        hp_score = (player_hp / self.p_max_hp.sum() - 0.3) / 0.3 * 2
+        variety_score = 1 - self.action_counts.max(axis=1) / (self.action_counts.sum(axis=1) + 1)
+        enemy_hp_score = (enemy_hp / self.e_max_hp.sum() - 0.3) / 0.3
+        win_score = np.where(self.p_alive.any(axis=1), 0, 2)
+        return np.column_stack((
+            duration_score, np.maximum(0, hp_score), variety_score, win_score, np.maximum(0, -enemy_hp_score)
+        ))
+
+    def fitness(self, weights=FITNESS_WEIGHTS):
+        objectives = self.objectives()
+        fitness = sum(w * objectives[:, k] for k, w in enumerate(weights))
+        return fitness, self.turn_count.copy(), (self.p_hp * self.p_alive).sum(axis=1)
+
+
+# Score every genome in population over `rollouts` independent battles in one
+# batched run. Returns (fitness, turns, player_hp) arrays of shape (len(population), rollouts).
+def evaluate_population(population, difficulty="Medium", rollouts=1, max_turns=5, rng=None):
+    genomes = np.asarray(population, dtype=np.float64)
+    battle = BatchBattle(np.repeat(genomes, rollouts, axis=0), difficulty, rng)
+    battle.run(max_turns)
+    shape = (len(genomes), rollouts)
+    return tuple(result.reshape(shape) for result in battle.fitness())
+
+
+MonteCarloResult = namedtuple("MonteCarloResult", "fitness half_width turns player_hp objectives")
+
+
+# Monte Carlo fitness over `rollouts` battles per genome, all simulated in one batch,
+# from a fresh battle or from the snapshot `start`.
+# With common_random_numbers every genome faces the same rollout draws, so differences
+# between genomes are not drowned out by luck. half_width is the normal-approximation
+# confidence interval half width around the mean fitness, and objectives holds the mean
+# objective vector of each genome.
+def evaluate_monte_carlo(population, difficulty="Medium", rollouts=100, max_turns=5, seed=None, offset=0,
+                         common_random_numbers=True, confidence=0.95, start=None):
+    genomes = np.asarray(population, dtype=np.float64)
+    n = len(genomes)
+    if common_random_numbers:
+        rng = np.random.default_rng(None if seed is None else derive_seed(seed))
+        draws = np.tile(rng.random((rollouts, max_turns, N_DRAWS)), (n, 1, 1))
+    else:
+        draws = np.concatenate([
+            np.random.default_rng(None if seed is None else derive_seed(seed, offset + i)).random((rollouts, max_turns, N_DRAWS))
+            for i in range(n)
+        ])
+    battle = BatchBattle(np.repeat(genomes, rollouts, axis=0), difficulty, start=start)
+    battle.run(max_turns, draws)
+    fitness, turns, player_hp = (result.reshape(n, rollouts) for result in battle.fitness())
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    spread = fitness.std(axis=1, ddof=1) if rollouts > 1 else np.zeros(n)
+    return MonteCarloResult(
+        fitness.mean(axis=1),
+        z * spread / np.sqrt(rollouts),
+        turns.mean(axis=1),
+        player_hp.mean(axis=1),
+        battle.objectives().reshape(n, rollouts, -1).mean(axis=1)
+    )
@@ -0,0 +1,95 @@
+import os
+import tempfile
+import zipfile
+from collections import namedtuple
+
+import numpy as np
+
+CHECKPOINT_MAGIC = "rpg-ga-checkpoint"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "checkpoints")
+
+Checkpoint = namedtuple("Checkpoint", "population best_behavior best_fitness generation fitness_scores")
+Front = namedtuple("Front", "genomes objectives difficulty max_turns")
+
+
+def checkpoint_path(difficulty, directory=CHECKPOINT_DIR):
+    return os.path.join(directory, f"{difficulty.lower()}.npz")
+
+
+def front_path(difficulty, directory=CHECKPOINT_DIR):
+    return os.path.join(directory, f"{difficulty.lower()}_front.npz")
+
+
+def _write_atomic(path, **arrays):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(f, magic=np.array(CHECKPOINT_MAGIC), version=np.array(CHECKPOINT_VERSION), **arrays)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+# Written to a temporary file in the same directory and renamed over the old
+# checkpoint, so a crash mid-write never leaves a truncated file behind
+def save_checkpoint(path, population, best_behavior, best_fitness, generation, fitness_scores=()):
+    _write_atomic(
+        path,
+        population=np.array(population, dtype=np.float64),
+        best_behavior=np.array(best_behavior, dtype=np.float64),
+        best_fitness=np.array(best_fitness, dtype=np.float64),
+        generation=np.array(generation),
+        fitness_scores=np.array([f[:3] for f in fitness_scores], dtype=np.float64).reshape(-1, 3)
+    )
+
+
+# Returns None when there is no usable checkpoint (missing, corrupt, or another version)
+def load_checkpoint(path):
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["magic"]) != CHECKPOINT_MAGIC or int(data["version"]) != CHECKPOINT_VERSION:
+                return None
+            return Checkpoint(
+                data["population"].tolist(),
+                data["best_behavior"].tolist(),
+                float(data["best_fitness"]),
+                int(data["generation"]),
+                [tuple(row) for row in data["fitness_scores"].tolist()]
+            )
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
+
+
+# A Pareto front from nsga2: its genomes, their objective vectors, and the difficulty
+# and battle length the objectives were measured at
+def save_front(path, genomes, objectives, difficulty, max_turns):
+    _write_atomic(
+        path,
+        genomes=np.array(genomes, dtype=np.float64),
+        objectives=np.array(objectives, dtype=np.float64),
+        difficulty=np.array(difficulty),
+        max_turns=np.array(max_turns)
+    )
+
+
+# Returns None when there is no usable front, including one evolved at another
+# difficulty or max_turns than the ones asked for
+def load_front(path, difficulty=None, max_turns=None):
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if str(data["magic"]) != CHECKPOINT_MAGIC or int(data["version"]) != CHECKPOINT_VERSION:
+                return None
+            front = Front(data["genomes"], data["objectives"], str(data["difficulty"]), int(data["max_turns"]))
+            if difficulty is not None and front.difficulty != difficulty:
+                return None
+            if max_turns is not None and front.max_turns != max_turns:
+                return None
+            return front
+    except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+        return None
@@ -0,0 +1,142 @@
+import numpy as np
+import pygame
+
+
+def _merge(rects):
+    merged = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        if not rect.w or not rect.h:
+            continue
+        i = 0
+        while i < len(merged):
+            if merged[i].colliderect(rect):
+                rect.union_ip(merged.pop(i))
+                i = 0
+            else:
+                i += 1
+        merged.append(rect)
+    return merged
+
+
+# Dirty-rectangle renderer. Each frame the draw functions record their drawing into named
+# widgets through fill/rect/circle/blit, which mirror the pygame calls. A widget's list
+# of recorded operations is its state: present() compares it with the last frame's,
+# and only where a widget changed, appeared or went away (its old and new bounds) is
+# the screen redrawn. The redraw replays, clipped to that area and in recording order,
+# every widget overlapping it, so overlapping widgets stay correctly layered. The frame
+# ends with pygame.display.update on just those rects; a frame where nothing changed
+# draws and sends nothing.
+class DirtyRenderer:
+    def __init__(self, screen):
+        self.screen = screen
+        self.previous = {}
+        self.frame = []
+        self.ops = None
+        self.full_redraw = True
+        self.frames = 0
+        self.idle_frames = 0
+        self.pixels_updated = 0
+
+    def widget(self, name):
+        self.ops = []
+        self.frame.append((name, self.ops))
+
+    def fill(self, color, rect):
+        self.ops.append(("rect", tuple(color), tuple(rect), 0, 0))
+
+    def rect(self, color, rect, width=0, border_radius=0):
+        self.ops.append(("rect", tuple(color), tuple(rect), width, border_radius))
+
+    def circle(self, color, center, radius, width=0):
+        self.ops.append(("circle", tuple(color), tuple(center), radius, width))
+
+    def blit(self, surface, dest):
+        self.ops.append(("blit", surface, tuple(dest[:2])))
+
+    # One surface drawn at many places, e.g. particles; positions is an (n, 2) array of
+    # top-left corners, recorded as raw bytes so comparing frames stays cheap
+    def blits(self, surface, positions):
+        self.ops.append(("blits", surface, np.asarray(positions, dtype=np.int32).tobytes()))
+
+    # Redraw everything on the next present(), e.g. after the window was exposed
+    def invalidate(self):
+        self.full_redraw = True
+
+    def present(self):
+        current = {}
+        dirty = []
+        for name, ops in self.frame:
+            ops = tuple(ops)
+            old = self.previous.get(name)
+            if old is not None and old[0] == ops:
+                current[name] = old
+                continue
+            current[name] = (ops, self._bounds(ops))
+            dirty.append(current[name][1])
+            if old is not None:
+                dirty.append(old[1])
+        dirty.extend(rect for name, (_, rect) in self.previous.items() if name not in current)
+        if self.full_redraw:
+            dirty = [self.screen.get_rect()]
+            self.full_redraw = False
+
+        rects = _merge(dirty)
+        for clip in rects:
+            self.screen.set_clip(clip)
+            for name, _ in self.frame:
+                ops, bounds = current[name]
+                if bounds.colliderect(clip):
+                    self._draw(ops)
+        self.screen.set_clip(None)
+
+        self.previous = current
+        self.frame = []
+        self.ops = None
+        self.frames += 1
+        if rects:
+            pygame.display.update(rects)
+            self.pixels_updated += sum(rect.w * rect.h for rect in rects)
+        else:
+            self.idle_frames += 1
+        return rects
+
+    def _bounds(self, ops):
+        bounds = pygame.Rect(0, 0, 0, 0)
+        for op in ops:
+            if op[0] == "rect":
+                rect = pygame.Rect(op[2])
+            elif op[0] == "circle":
+                (x, y), r = op[2], op[3]
+                rect = pygame.Rect(x - r - 1, y - r - 1, 2 * r + 3, 2 * r + 3)
+            elif op[0] == "blits":
+                positions = np.frombuffer(op[2], dtype=np.int32).reshape(-1, 2)
+                if not len(positions):
+                    continue
+                (x, y), (right, bottom) = positions.min(axis=0), positions.max(axis=0) + op[1].get_size()
+                rect = pygame.Rect(int(x), int(y), int(right - x), int(bottom - y))
+            else:
+                rect = op[1].get_rect(topleft=op[2])
+            bounds = rect if not bounds.w else bounds.union(rect)
+        return bounds
+
+    # Square outlines are drawn as four filled edges: pygame.draw.rect with a width
+    # draws a spurious edge along the clip boundary when the clip cuts a thin slice
+    # through the rectangle, which is exactly what a dirty-rect redraw does
+    def _draw(self, ops):
+        for op in ops:
+            if op[0] == "rect" and op[3] > 0 and op[4] <= 0:
+                x, y, w, h = pygame.Rect(op[2])
+                width = min(op[3], w, h)
+                for edge in ((x, y, w, width), (x, y + h - width, w, width), (x, y, width, h), (x + w - width, y, width, h)):
+                    self.screen.fill(op[1], edge)
+            elif op[0] == "rect":
+                pygame.draw.rect(self.screen, op[1], op[2], op[3], op[4])
+            elif op[0] == "circle":
+                pygame.draw.circle(self.screen, op[1], op[2], op[3], op[4])
+            elif op[0] == "blits":
+                surface = op[1]
+                positions = np.frombuffer(op[2], dtype=np.int32).reshape(-1, 2).tolist()
+                self.screen.blits([(surface, position) for position in positions], doreturn=False)
+            else:
+                self.screen.blit(op[1], op[2])
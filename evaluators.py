@@ -0,0 +1,142 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+
+from simulation import make_battle, evaluate_fitness, spawn_rng
+from batch_sim import evaluate_monte_carlo
+from racing import RacingEvaluator
+
+
+# Genome `index` of a call seeded with `seed` always plays from spawn_rng(seed, index),
+# or from spawn_rng(seed) for every genome when common random numbers are requested.
+# Every evaluator also takes an optional BattleSnapshot `start` to play from.
+def _evaluate_one(battle, genome, max_turns, seed, index, common_random_numbers, start=None):
+    if seed is None:
+        rng = random.Random()
+    elif common_random_numbers:
+        rng = spawn_rng(seed)
+    else:
+        rng = spawn_rng(seed, index)
+    return evaluate_fitness(battle, genome, max_turns, rng, start)
+
+
+# Evaluates genomes one after another in the calling process
+class SerialEvaluator:
+    workers = 1
+    batched = False
+
+    def __init__(self):
+        self.battles = {}
+
+    def evaluate(self, population, difficulty="Medium", max_turns=5, seed=None, offset=0, common_random_numbers=False,
+                 start=None):
+        if difficulty not in self.battles:
+            self.battles[difficulty] = make_battle(difficulty)
+        battle = self.battles[difficulty]
+        return [
+            _evaluate_one(battle, genome, max_turns, seed, offset + i, common_random_numbers, start)
+            for i, genome in enumerate(population)
+        ]
+
+    def close(self):
+        self.battles.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Battles owned by a pool worker, kept for the lifetime of the process
+_worker_battles = {}
+
+
+def _evaluate_chunk(chunk, difficulty, max_turns, seed, common_random_numbers, start=None):
+    if difficulty not in _worker_battles:
+        _worker_battles[difficulty] = make_battle(difficulty)
+    battle = _worker_battles[difficulty]
+    return [_evaluate_one(battle, genome, max_turns, seed, i, common_random_numbers, start) for i, genome in chunk]
+
+
+# Spreads contiguous chunks of the population over long-lived worker processes.
+# For a given seed the results match SerialEvaluator exactly.
+class ProcessPoolEvaluator:
+    batched = False
+
+    def __init__(self, workers=None, chunks_per_worker=4):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker
+        self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def evaluate(self, population, difficulty="Medium", max_turns=5, seed=None, offset=0, common_random_numbers=False,
+                 start=None):
+        indexed = list(enumerate(population, offset))
+        if not indexed:
+            return []
+        chunk_size = max(1, -(-len(indexed) // (self.workers * self.chunks_per_worker)))
+        futures = [
+            self.executor.submit(
+                _evaluate_chunk, indexed[first:first + chunk_size], difficulty, max_turns, seed, common_random_numbers,
+                start
+            )
+            for first in range(0, len(indexed), chunk_size)
+        ]
+        results = []
+        for future in futures:
+            results.extend(future.result())
+        return results
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Scores each genome as the mean of many batched rollouts. Results are
+# (mean_fitness, mean_turns, mean_player_hp, ci_half_width) tuples.
+class MonteCarloEvaluator:
+    workers = 1
+    batched = True
+
+    def __init__(self, rollouts=100, confidence=0.95):
+        self.rollouts = rollouts
+        self.confidence = confidence
+
+    def evaluate(self, population, difficulty="Medium", max_turns=5, seed=None, offset=0, common_random_numbers=True,
+                 start=None):
+        if not len(population):
+            return []
+        result = evaluate_monte_carlo(
+            population, difficulty, self.rollouts, max_turns, seed, offset, common_random_numbers, self.confidence, start
+        )
+        return list(zip(
+            result.fitness.tolist(), result.turns.tolist(), result.player_hp.tolist(), result.half_width.tolist()
+        ))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+EVALUATORS = {
+    "serial": SerialEvaluator,
+    "process": ProcessPoolEvaluator,
+    "monte_carlo": MonteCarloEvaluator,
+    "racing": RacingEvaluator
+}
+
+
+def make_evaluator(backend="serial", **options):
+    if backend not in EVALUATORS:
+        raise ValueError(f"Unknown evaluator backend: {backend}")
+    return EVALUATORS[backend](**options)
@@ -0,0 +1,55 @@
+from collections import deque
+
+DEBUG, INFO, WARNING = 10, 20, 30
+OFF = 100
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING"}
+
+
+# Levelled event log. Disabled levels cost one comparison and messages are only
+# formatted once they pass it. Records are kept in memory (newest `capacity`) and,
+# with a sink, written out in batches of `flush_every` lines instead of one write
+# per event. The default level is OFF so simulations log nothing.
+class EventLog:
+    def __init__(self, level=OFF, sink=None, capacity=1000, flush_every=64):
+        self.level = level
+        self.sink = sink
+        self.records = deque(maxlen=capacity)
+        self.flush_every = flush_every
+        self.pending = []
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def log(self, level, message, *args):
+        if level < self.level:
+            return
+        if args:
+            message = message % args
+        self.records.append((level, message))
+        if self.sink is not None:
+            self.pending.append(f"{LEVEL_NAMES[level]}: {message}\n")
+            if len(self.pending) >= self.flush_every:
+                self.flush()
+
+    def debug(self, message, *args):
+        self.log(DEBUG, message, *args)
+
+    def info(self, message, *args):
+        self.log(INFO, message, *args)
+
+    def warning(self, message, *args):
+        self.log(WARNING, message, *args)
+
+    def tail(self, n):
+        start = max(0, len(self.records) - n)
+        return [self.records[i] for i in range(start, len(self.records))]
+
+    def flush(self):
+        if self.pending:
+            self.sink.write("".join(self.pending))
+            self.sink.flush()
+            self.pending.clear()
+
+    def close(self):
+        if self.sink is not None:
+            self.flush()
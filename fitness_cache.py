@@ -0,0 +1,127 @@
+import math
+from collections import OrderedDict
+from statistics import NormalDist
+
+
+# Running totals for one cached genome, pooled over every rollout it has played
+class CacheEntry:
+    __slots__ = ("rollouts", "fitness_sum", "fitness_sq_sum", "turns_sum", "hp_sum")
+
+    def __init__(self):
+        self.rollouts = 0
+        self.fitness_sum = 0.0
+        self.fitness_sq_sum = 0.0
+        self.turns_sum = 0.0
+        self.hp_sum = 0.0
+
+    def add(self, rollouts, fitness, turns, player_hp, sample_var=0.0):
+        self.rollouts += rollouts
+        self.fitness_sum += rollouts * fitness
+        self.fitness_sq_sum += (rollouts - 1) * sample_var + rollouts * fitness ** 2
+        self.turns_sum += rollouts * turns
+        self.hp_sum += rollouts * player_hp
+
+    def result(self, z):
+        n = self.rollouts
+        mean = self.fitness_sum / n
+        var = max(0.0, (self.fitness_sq_sum - n * mean ** 2) / (n - 1)) if n > 1 else 0.0
+        return mean, self.turns_sum / n, self.hp_sum / n, z * math.sqrt(var / n)
+
+
+# Bounded LRU map from (difficulty, settings, quantized genome) to pooled rollouts
+class FitnessCache:
+    def __init__(self, max_entries=4096, resolution=0.05):
+        self.max_entries = max_entries
+        self.resolution = resolution
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rollouts_saved = 0
+
+    def key(self, genome, difficulty, settings):
+        genes = tuple(round(gene / self.resolution) for behavior in genome for gene in behavior)
+        return difficulty, settings, genes
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def entry(self, key):
+        entry = self.get(key)
+        if entry is None:
+            entry = self.entries[key] = CacheEntry()
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.entries.clear()
+
+
+# Evaluator wrapper that memoizes fitness. A genome is simulated again (and its new
+# rollouts pooled with the old ones) until it has max_rollouts behind it; after that
+# lookups are free hits. Duplicates within one call are simulated once. Extra options
+# are part of the key; a start snapshot is keyed by identity, so each snapshot
+# (one per retraining job) gets its own entries.
+class CachedEvaluator:
+    def __init__(self, inner, cache=None, max_rollouts=None):
+        self.inner = inner
+        self.cache = cache if cache is not None else FitnessCache()
+        self.rollouts_per_call = getattr(inner, "rollouts", 1)
+        self.max_rollouts = max_rollouts if max_rollouts is not None else 4 * self.rollouts_per_call
+        self.z = NormalDist().inv_cdf(0.5 + getattr(inner, "confidence", 0.95) / 2)
+
+    @property
+    def workers(self):
+        return self.inner.workers
+
+    @property
+    def batched(self):
+        return self.inner.batched
+
+    def evaluate(self, population, difficulty="Medium", max_turns=5, seed=None, offset=0, **options):
+        settings = (type(self.inner).__name__, self.rollouts_per_call, max_turns, tuple(sorted(options.items())))
+        keys = [self.cache.key(genome, difficulty, settings) for genome in population]
+        entries = {}
+        pending = {}
+        for key, genome in zip(keys, population):
+            entry = self.cache.get(key)
+            if key in entries or key in pending:
+                self.cache.hits += 1
+                self.cache.rollouts_saved += self.rollouts_per_call
+            elif entry is not None and entry.rollouts >= self.max_rollouts:
+                self.cache.hits += 1
+                self.cache.rollouts_saved += self.rollouts_per_call
+                entries[key] = entry
+            else:
+                self.cache.misses += 1
+                pending[key] = genome
+
+        if pending:
+            results = self.inner.evaluate(list(pending.values()), difficulty, max_turns, seed, offset, **options)
+            for key, result in zip(pending, results):
+                fitness, turns, player_hp = result[:3]
+                sample_var = 0.0
+                if len(result) > 3 and self.rollouts_per_call > 1:
+                    sample_var = (result[3] / self.z) ** 2 * self.rollouts_per_call
+                entry = entries[key] = self.cache.entry(key)
+                entry.add(self.rollouts_per_call, fitness, turns, player_hp, sample_var)
+
+        return [entries[key].result(self.z) for key in keys]
+
+    def close(self):
+        self.inner.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
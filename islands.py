@@ -0,0 +1,146 @@
+import multiprocessing
+import queue
+import random
+from collections import namedtuple
+
+import numpy as np
+
+from simulation import ENEMY_SPECS, derive_seed
+from evaluators import make_evaluator
+from optimizers import make_optimizer
+
+IslandResult = namedtuple("IslandResult", "best_behavior best_fitness population fitness_scores island_best")
+
+
+# Which islands each island sends its migrants to
+def _ring(n):
+    return [[(i + 1) % n] if n > 1 else [] for i in range(n)]
+
+
+def _fully_connected(n):
+    return [[j for j in range(n) if j != i] for i in range(n)]
+
+
+def _isolated(n):
+    return [[] for _ in range(n)]
+
+
+TOPOLOGIES = {
+    "ring": _ring,
+    "all": _fully_connected,
+    "none": _isolated
+}
+
+
+# Migrants travel as raw float64 bytes: one row per genome, its fitness followed by
+# its genes, so a message is a single buffer rather than a pickled nested list
+def _pack(genomes, fitness):
+    return np.column_stack((fitness, genomes.reshape(len(genomes), -1))).tobytes()
+
+
+def _unpack(data, num_enemies):
+    rows = np.frombuffer(data, dtype=np.float64).reshape(-1, 1 + num_enemies * 4)
+    return rows[:, 1:].reshape(-1, num_enemies, 4), rows[:, 0]
+
+
+# One island: run a private optimizer, and every `interval` generations send the best
+# `migrants` genomes to each outbox. Arrivals from the inboxes are told to the optimizer
+# along with its own candidates. Every island scores generation g with the same seed,
+# so fitness values are comparable across islands.
+def _island_main(index, settings, seed, inboxes, outboxes, results):
+    difficulty, population_size, generations, interval, migrants, max_turns, optimizer, backend, options = settings
+    num_enemies = len(ENEMY_SPECS)
+    optimizer = make_optimizer(
+        optimizer, num_enemies, difficulty, derive_seed(seed, "island", index), population_size=population_size
+    )
+    with make_evaluator(backend, **options) as evaluator:
+        for generation in range(generations):
+            population = optimizer.ask()
+            scores = np.array([s[:3] for s in evaluator.evaluate(population, difficulty, max_turns, derive_seed(seed, generation))])
+            told, told_scores = population, scores
+            if interval and migrants and (generation + 1) % interval == 0 and generation < generations - 1:
+                order = np.argsort(scores[:, 0])
+                message = _pack(population[order[:migrants]], scores[order[:migrants], 0])
+                for outbox in outboxes:
+                    outbox.send_bytes(message)
+                for inbox in inboxes:
+                    genomes, fitness = _unpack(inbox.recv_bytes(), num_enemies)
+                    told = np.concatenate((told, genomes))
+                    told_scores = np.concatenate((told_scores, np.column_stack((fitness, np.full((len(fitness), 2), np.nan)))))
+            optimizer.tell(told, told_scores)
+    results.put((index, population.tobytes(), scores.tobytes()))
+
+
+# Island model for offline tuning: `islands` sub-populations evolve in their own
+# processes and exchange migrants along `topology` every `migration_interval` generations.
+# Each island runs the named optimizer (the GA by default) and evaluates in-process
+# with the given evaluator backend.
+class IslandModel:
+    def __init__(self, islands=4, population=50, topology="ring", migration_interval=5, migrants=2,
+                 difficulty="Medium", max_turns=5, optimizer="ga", backend="monte_carlo", seed=None, **evaluator_options):
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown migration topology: {topology}")
+        self.islands = islands
+        self.population = population
+        self.topology = topology
+        self.migration_interval = migration_interval
+        self.migrants = min(migrants, population - 1)
+        self.difficulty = difficulty
+        self.max_turns = max_turns
+        self.optimizer = optimizer
+        self.backend = backend
+        self.evaluator_options = evaluator_options
+        self.seed = seed if seed is not None else random.SystemRandom().randrange(2 ** 32)
+
+    def run(self, generations):
+        context = multiprocessing.get_context()
+        targets = TOPOLOGIES[self.topology](self.islands)
+        inboxes = [[] for _ in range(self.islands)]
+        outboxes = [[] for _ in range(self.islands)]
+        for source, destinations in enumerate(targets):
+            for destination in destinations:
+                receiver, sender = context.Pipe(duplex=False)
+                outboxes[source].append(sender)
+                inboxes[destination].append(receiver)
+
+        settings = (
+            self.difficulty, self.population, generations, self.migration_interval, self.migrants,
+            self.max_turns, self.optimizer, self.backend, self.evaluator_options
+        )
+        results = context.Queue()
+        processes = [
+            context.Process(
+                target=_island_main, args=(i, settings, self.seed, inboxes[i], outboxes[i], results), daemon=True
+            )
+            for i in range(self.islands)
+        ]
+        for process in processes:
+            process.start()
+        try:
+            collected = self._collect(results, processes)
+        finally:
+            for process in processes:
+                process.join(timeout=1)
+                if process.is_alive():
+                    process.terminate()
+
+        num_enemies = len(ENEMY_SPECS)
+        population = np.concatenate([
+            np.frombuffer(collected[i][0], dtype=np.float64).reshape(-1, num_enemies, 4) for i in range(self.islands)
+        ])
+        scores = np.concatenate([np.frombuffer(collected[i][1], dtype=np.float64).reshape(-1, 3) for i in range(self.islands)])
+        island_best = scores[:, 0].reshape(self.islands, -1).min(axis=1)
+        best = int(np.argmin(scores[:, 0]))
+        return IslandResult(population[best], float(scores[best, 0]), population, scores, island_best)
+
+    def _collect(self, results, processes):
+        collected = {}
+        while len(collected) < len(processes):
+            try:
+                index, population, scores = results.get(timeout=1)
+            except queue.Empty:
+                if any(p.exitcode not in (None, 0) for p in processes):
+                    raise RuntimeError("An island process exited without returning its population")
+                continue
+            collected[index] = (population, scores)
+        return collected
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+
+
+def _surface_bytes(surface):
+    return surface.get_pitch() * surface.get_height()
+
+
+# Pre-rendered static layers, one surface per (layer name, theme). `builders` maps each
+# layer name to a function that composites it for a theme; a layer is built the first
+# time it is asked for and reused after that. The least recently used layers are dropped
+# once the surfaces together take more than max_bytes, and trim() frees more on demand.
+class LayerCache:
+    def __init__(self, builders, max_bytes=16 * 2 ** 20):
+        self.builders = builders
+        self.max_bytes = max_bytes
+        self.layers = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.builds = 0
+        self.evictions = 0
+
+    def get(self, name, theme):
+        key = (name, theme)
+        surface = self.layers.get(key)
+        if surface is not None:
+            self.layers.move_to_end(key)
+            self.hits += 1
+            return surface
+        surface = self.layers[key] = self.builders[name](theme)
+        self.bytes += _surface_bytes(surface)
+        self.builds += 1
+        self.trim(self.max_bytes)
+        return surface
+
+    # Drops least recently used layers until at most max_bytes remain, always keeping
+    # the layer built last
+    def trim(self, max_bytes=0):
+        while self.bytes > max_bytes and len(self.layers) > 1:
+            _, surface = self.layers.popitem(last=False)
+            self.bytes -= _surface_bytes(surface)
+            self.evictions += 1
+
+    def invalidate(self, theme):
+        for key in [key for key in self.layers if key[1] == theme]:
+            self.bytes -= _surface_bytes(self.layers.pop(key))
+
+    def clear(self):
+        self.layers.clear()
+        self.bytes = 0
@@ -1,7 +1,26 @@
 import pygame
 import random
+import sys
+import time
+from functools import partial
 import numpy as np
 
+from simulation import DIFFICULTIES, Character, make_battle, derive_seed, spawn_rng
+from optimizers import make_optimizer
+from evaluators import make_evaluator
+from fitness_cache import CachedEvaluator
+from training import BackgroundTrainer, FrameBudget, GenerationRun
+from checkpoint import checkpoint_path, save_checkpoint, load_checkpoint, front_path, load_front
+from nsga2 import FRONT_MAX_TURNS, ParetoFront
+from ringbuffer import LogBuffer
+from eventlog import DEBUG, INFO, EventLog
+from mcts import MCTSController
+from surrogate import Prescreen, make_surrogate
+from text_cache import TextCache
+from dirty_rects import DirtyRenderer
+from layer_cache import LayerCache
+from particles import ParticleSystem
+
 # Initialize Pygame
 pygame.init()
 
@@ -11,6 +30,30 @@ SCALE_FACTOR = 1
 WIDTH, HEIGHT = BASE_WIDTH * SCALE_FACTOR, BASE_HEIGHT * SCALE_FACTOR
 INFO_WIDTH = 1000 * SCALE_FACTOR
 BATTLE_WIDTH = WIDTH - INFO_WIDTH
+MESSAGE_BOX = (20 * SCALE_FACTOR, HEIGHT - 240 * SCALE_FACTOR, BATTLE_WIDTH - 40 * SCALE_FACTOR, 100 * SCALE_FACTOR)
+MENU_BOX = (20 * SCALE_FACTOR, HEIGHT - 120 * SCALE_FACTOR, BATTLE_WIDTH - 40 * SCALE_FACTOR, 100 * SCALE_FACTOR)
+BOX_MARGIN = 5 * SCALE_FACTOR
+THEME_DROPDOWN = (BATTLE_WIDTH + 10 * SCALE_FACTOR, 10 * SCALE_FACTOR, 220 * SCALE_FACTOR, 40 * SCALE_FACTOR)
+DIFFICULTY_DROPDOWN = (BATTLE_WIDTH + 240 * SCALE_FACTOR, 10 * SCALE_FACTOR, 180 * SCALE_FACTOR, 40 * SCALE_FACTOR)
+# "monte_carlo" scores every genome with the same number of batched rollouts, "racing" stops
+# simulating genomes once they are clearly worse, "serial"/"process" play one battle per genome
+EVALUATOR_BACKEND = "monte_carlo"
+SEED = None  # set to an int to replay a session's GA exactly
+TRAINING_FRAME_BUDGET = 0.012  # seconds of GA evaluation per frame during startup training
+RETRAIN_IN_BACKGROUND = True  # False steps mid-battle retraining within TRAINING_FRAME_BUDGET instead
+LOG_FILE = None  # set to a path to keep the full battle log; only the last 50 entries stay in memory
+EVENT_LOG_LEVEL = INFO  # DEBUG also records clicks and every enemy decision
+EVENT_LOG_FILE = None  # events go to stdout, flushed once per frame, unless this is a path
+OPTIMIZER = "ga"  # "cmaes" or "cem" search the behavior space with fewer simulated battles
+ENEMY_CONTROLLER = "ga"  # "mcts" searches each enemy move, using the evolved behaviors for rollouts
+MCTS_TIME_BUDGET = 0.02  # seconds of search per enemy move
+LAYER_CACHE_BYTES = 16 * 2 ** 20  # memory for pre-rendered theme layers; least recently used ones are dropped
+SPECIAL_PARTICLES = 10  # particles kept around the target of a special attack while it plays
+PARTICLE_CAPACITY = 4096  # particles alive at once across all effects
+RETRAIN_MAX_TURNS = FRONT_MAX_TURNS  # turns each mid-battle retraining candidate plays from the live position
+SURROGATE = None  # "ridge" or "knn" predicts retraining fitness and only simulates the most promising candidates
+FPS = 30  # frame rate while anything is animating, training or retraining
+IDLE_WAIT_MS = 500  # longest the idle loop blocks waiting for input before checking again
 SCREEN = pygame.display.set_mode((WIDTH, HEIGHT))
 pygame.display.set_caption("RPG Game")
 
@@ -25,6 +68,13 @@ except:
     SMALL_FONT = pygame.font.SysFont(None, int(18 * SCALE_FACTOR))
     VS_FONT = pygame.font.SysFont(None, int(60 * SCALE_FACTOR))
 
+# Rendered labels, reused across frames while their text and color stay the same
+TEXT_CACHE = TextCache()
+
+# Visual effects draw from their own stream so they never disturb the simulation
+FX_RNG = random.Random()
+PARTICLES = ParticleSystem(PARTICLE_CAPACITY)
+
 # Colors
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
@@ -143,502 +193,63 @@ THEMES = {
     }
 }
 
-# Difficulty Settings
-DIFFICULTIES = {
-    "Easy": {
-        "hp_scale": 0.6,
-        "attack_scale": 0.5,
-        "defense_scale": 0.5,
-        "attack_prob_adjust": -0.2,
-        "heal_prob_adjust": -0.1,
-        "special_prob_adjust": -0.2,
-        "heal_effectiveness": 1.5
-    },
-    "Medium": {
-        "hp_scale": 1.0,
-        "attack_scale": 1.0,
-        "defense_scale": 1.0,
-        "attack_prob_adjust": 0.0,
-        "heal_prob_adjust": 0.0,
-        "special_prob_adjust": 0.0,
-        "heal_effectiveness": 1.0
-    },
-    "Hard": {
-        "hp_scale": 2.0,
-        "attack_scale": 1.8,
-        "defense_scale": 1.6,
-        "attack_prob_adjust": 0.3,
-        "heal_prob_adjust": 0.2,
-        "special_prob_adjust": 0.3,
-        "heal_effectiveness": 0.5
-    }
-}
-
-# Game entities
-class Character:
-    def __init__(self, name, hp, attack, defense, role="dps", difficulty="Medium"):
-        self.name = name
-        self.base_hp = hp
-        self.base_attack = attack
-        self.base_defense = defense
-        self.difficulty = difficulty
-        self.hp_scale = DIFFICULTIES[difficulty]["hp_scale"]
-        self.attack_scale = DIFFICULTIES[difficulty]["attack_scale"]
-        self.defense_scale = DIFFICULTIES[difficulty]["defense_scale"]
-        self.heal_effectiveness = DIFFICULTIES[difficulty]["heal_effectiveness"]
-        self.max_hp = int(hp * self.hp_scale) if role != "dps" and role != "healer" else hp
-        self.hp = self.max_hp
-        self.attack = int(attack * self.attack_scale) if role != "dps" and role != "healer" else attack
-        self.defense = int(defense * self.defense_scale) if role != "dps" and role != "healer" else defense
-        self.role = role
-        self.alive = True
-        self.status = {}
-        self.shake_offset = 0
-        self.shake_timer = 0
-        self.flash_timer = 0
-        self.position_offset = [0, 0]
-        self.glow_timer = 0
-        self.particles = []
-
-    def reset(self):
-        self.hp = self.max_hp
-        self.alive = True
-        self.status = {}
-        self.defense = int(self.base_defense * self.defense_scale) if self.role != "dps" and self.role != "healer" else self.base_defense
-        self.glow_timer = 0
-        self.particles = []
-
-    def apply_status(self, status, duration):
-        self.status[status] = duration
-        self.flash_timer = 0.5
-
-    def update_status(self):
-        for status in list(self.status.keys()):
-            if status == "poison":
-                self.take_damage(5)
-                self.status[status] -= 1
-            elif status == "stun":
-                self.status[status] -= 1
-            if self.status[status] <= 0:
-                del self.status[status]
-
-    def take_damage(self, damage):
-        actual_damage = max(0, damage - self.defense)
-        self.hp = max(0, self.hp - actual_damage)
-        if self.hp == 0:
-            self.alive = False
-        self.shake_timer = 0.5
-        self.flash_timer = 0.5
-        return actual_damage
-
-    def heal(self, amount):
-        adjusted_amount = int(amount * self.heal_effectiveness)
-        self.hp = min(self.max_hp, self.hp + adjusted_amount)
-        self.glow_timer = 0.5
-        return adjusted_amount
-
-# Battle system
-class Battle:
-    def __init__(self, players, enemies, enemy_behaviors):
-        self.players = players
-        self.enemies = enemies
-        self.enemy_behaviors = enemy_behaviors
-        self.current_enemy_behaviors = [list(beh) for beh in enemy_behaviors]
-        self.turn = "player"
-        self.log = []
-        self.turn_count = 0
-        self.active_player = 0
-        self.active_enemy = 0
-        self.last_ga_turn = -5
-        self.player_action_history = []
-        self.enemy_action_history = [[] for _ in enemies]
-        self.animation_state = None
-        self.animation_timer = 0
-        self.current_message = None
-        self.message_timer = 0
-
-    def reset(self):
-        for p in self.players + self.enemies:
-            p.reset()
-        self.turn = "player"
-        self.log = []
-        self.turn_count = 0
-        self.active_player = 0
-        self.active_enemy = 0
-        self.last_ga_turn = -5
-        self.player_action_history = []
-        self.enemy_action_history = [[] for _ in self.enemies]
-        self.current_enemy_behaviors = [list(beh) for beh in self.enemy_behaviors]
-        self.animation_state = None
-        self.animation_timer = 0
-        self.current_message = None
-        self.message_timer = 0
-
-    def get_first_alive_enemy(self):
-        for i, enemy in enumerate(self.enemies):
-            if enemy.alive:
-                return i
-        return None
-
-    def get_first_alive_player(self):
-        for i, player in enumerate(self.players):
-            if player.alive:
-                return i
-        return None
-
-    def player_action(self, action, target_idx):
-        alive_players = [i for i, p in enumerate(self.players) if p.alive]
-        if not alive_players:
-            return
-        self.active_player = alive_players[self.active_player % len(alive_players)]
-        player = self.players[self.active_player]
-
-        if action != "heal" and action != "defend":
-            if not (0 <= target_idx < len(self.enemies) and self.enemies[target_idx].alive):
-                target_idx = self.get_first_alive_enemy()
-                if target_idx is None:
-                    self.log.append("No enemies left to target!")
-                    return
-            self.enemy_action_history[target_idx].append(action)
-            if len(self.enemy_action_history[target_idx]) > 5:
-                self.enemy_action_history[target_idx].pop(0)
-
-        self.player_action_history.append(action)
-        if len(self.player_action_history) > 5:
-            self.player_action_history.pop(0)
-
-        if action == "attack":
-            damage = self.enemies[target_idx].take_damage(player.attack)
-            self.log.append(f"{player.name} attacks {self.enemies[target_idx].name} for {damage} damage")
-            self.animation_state = {"type": "attack", "user": "player", "target_idx": target_idx}
-            self.animation_timer = 1.0
-        elif action == "defend":
-            player.defense += 5
-            self.log.append(f"{player.name} defends, boosting defense")
-            self.animation_state = {"type": "defend", "user": "player"}
-            self.animation_timer = 0.5
-        elif action == "heal":
-            target = min(self.players, key=lambda p: p.hp / p.max_hp if p.alive else float('inf'))
-            adjusted_amount = target.heal(20)
-            self.log.append(f"{player.name} heals {target.name} for {adjusted_amount} HP")
-            self.animation_state = {"type": "heal", "user": "player"}
-            self.animation_timer = 0.5
-        elif action == "special":
-            if random.random() < 0.3:
-                self.enemies[target_idx].apply_status("stun", 1)
-                self.log.append(f"{player.name} stuns {self.enemies[target_idx].name}")
-            else:
-                damage = self.enemies[target_idx].take_damage(player.attack * 2)
-                self.log.append(f"{player.name} uses special attack for {damage} damage")
-            self.animation_state = {"type": "special", "user": "player", "target_idx": target_idx}
-            self.animation_timer = 1.0
-
-        self.active_player = (self.active_player + 1) % len(alive_players)
-        self.turn = "enemy"
-        self.current_message = self.log[-1]
-        self.message_timer = 1.0
-
-    def enemy_action(self):
-        alive_enemies = [i for i, e in enumerate(self.enemies) if e.alive]
-        if not alive_enemies:
-            self.log.append("No enemies left to act!")
-            self.turn = "player"
-            return
-
-        self.active_enemy = self.active_enemy % len(alive_enemies)
-        self.active_enemy = alive_enemies[self.active_enemy]
-
-        print(f"Enemy action: active_enemy={self.active_enemy}, len(enemies)={len(self.enemies)}, len(current_enemy_behaviors)={len(self.current_enemy_behaviors)}, len(enemy_action_history)={len(self.enemy_action_history)}")
-
-        if not (0 <= self.active_enemy < len(self.current_enemy_behaviors)):
-            self.log.append(f"Error: active_enemy {self.active_enemy} out of bounds for current_enemy_behaviors!")
-            self.turn = "player"
-            return
-        if not (0 <= self.active_enemy < len(self.enemy_action_history)):
-            self.log.append(f"Error: active_enemy {self.active_enemy} out of bounds for enemy_action_history!")
-            self.turn = "player"
-            return
-
-        enemy = self.enemies[self.active_enemy]
-        behavior = self.current_enemy_behaviors[self.active_enemy]
-
-        attack_prob, heal_prob, heal_threshold, special_prob = behavior
-        difficulty_adjust = DIFFICULTIES[enemy.difficulty]
-        attack_prob += difficulty_adjust["attack_prob_adjust"]
-        heal_prob += difficulty_adjust["heal_prob_adjust"]
-        special_prob += difficulty_adjust["special_prob_adjust"]
-
-        # Clamp probabilities immediately after difficulty adjustment
-        attack_prob = max(0, min(1, attack_prob))
-        heal_prob = max(0, min(1, heal_prob))
-        special_prob = max(0, min(1, special_prob))
-
-        recent_actions = self.player_action_history[-3:]
-        attack_count = recent_actions.count("attack") + recent_actions.count("special")
-        heal_count = recent_actions.count("heal")
-
-        # Flag to track if the enemy heals during this turn
-        did_heal = False
-
-        if attack_count == 3 and enemy.name == "Goblin":
-            target = min(self.enemies, key=lambda e: e.hp / e.max_hp if e.alive else float('inf'))
-            adjusted_amount = target.heal(20)
-            self.log.append(f"{enemy.name} heals {target.name} for {adjusted_amount} HP due to your consecutive attacks!")
-            self.animation_state = {"type": "heal", "user": "enemy"}
-            self.animation_timer = 0.5
-            # Adjust probabilities since the Goblin healed
-            heal_prob = min(1, heal_prob + 0.3)  # Increase heal_prob due to healing action
-            attack_prob = max(0, attack_prob - 0.1)  # Slightly reduce attack_prob
-            special_prob = max(0, special_prob - 0.05)  # Slightly reduce special_prob
-            did_heal = True
-        elif attack_count == 2 and enemy.name == "Goblin":
-            enemy.defense += 5
-            self.log.append(f"{enemy.name} defends due to your consecutive attacks!")
-            self.animation_state = {"type": "defend", "user": "enemy"}
-            self.animation_timer = 0.5
-            # Adjust probabilities since the Goblin defended
-            attack_prob = max(0, attack_prob - 0.1)  # Reduce attack_prob after defending
-            heal_prob = min(1, heal_prob + 0.1)  # Slightly increase heal_prob
-            special_prob = max(0, special_prob - 0.05)  # Slightly reduce special_prob
-        elif heal_count >= 3 and enemy.name == "Goblin":
-            alive_players = [i for i, p in enumerate(self.players) if p.alive]
-            if not alive_players:
-                self.log.append(f"{enemy.name} has no targets to attack!")
-                self.turn = "player"
-                return
-            target_idx = random.choice(alive_players)
-            self.players[target_idx].apply_status("poison", 3)
-            self.log.append(f"{enemy.name} poisons {self.players[target_idx].name} due to your frequent healing!")
-            damage = self.players[target_idx].take_damage(enemy.attack * 2.5)
-            self.log.append(f"{enemy.name} uses special attack for {damage} damage")
-            self.animation_state = {"type": "special", "user": "enemy", "target_idx": target_idx}
-            self.animation_timer = 1.0
-            # Adjust probabilities since the Goblin used a special attack
-            special_prob = min(1, special_prob + 0.2)  # Increase special_prob
-            attack_prob = max(0, attack_prob - 0.1)  # Slightly reduce attack_prob
-            heal_prob = max(0, heal_prob - 0.1)  # Decrease heal_prob to reflect shift to special attack
-        elif "stun" in enemy.status:
-            self.log.append(f"{enemy.name} is stunned and skips its turn")
-        else:
-            # General behavior adjustments based on player actions
-            if attack_count >= 2:
-                heal_prob = min(1, heal_prob + 0.4)
-                heal_threshold = max(0.5, heal_threshold - 0.2)
-                self.log.append(f"{enemy.name} notices your aggressive attacks and prepares to heal!")
-            if heal_count >= 2:
-                special_prob = min(1, special_prob + 0.4)
-                self.log.append(f"{enemy.name} notices your frequent healing and prepares a special attack!")
-                heal_prob = max(0, heal_prob - 0.1)  # Decrease heal_prob due to preparing special attack
-
-            # Adjustments based on the enemy's own recent actions
-            recent_attacks = self.enemy_action_history[self.active_enemy][-3:]
-            consecutive_attacks = recent_attacks.count("attack") + recent_attacks.count("special")
-            if consecutive_attacks >= 3:
-                attack_prob = max(0, attack_prob - 0.3)
-                heal_prob = min(1, heal_prob + 0.2)
-                self.log.append(f"{enemy.name} feels pressured and prepares to heal!")
-            if consecutive_attacks >= 5 and enemy.hp / enemy.max_hp < 0.75:
-                heal_prob = min(1, heal_prob + 0.4)
-                heal_threshold = max(0.5, heal_threshold - 0.2)
-                self.log.append(f"{enemy.name} is heavily damaged and prioritizes healing!")
-
-            # Adjustments based on total player HP
-            total_player_hp = sum(p.hp for p in self.players if p.alive) / sum(p.max_hp for p in self.players)
-            if total_player_hp < 0.3:
-                attack_prob = min(1, attack_prob + 0.3)
-                special_prob = min(1, special_prob + 0.3)
-                self.log.append(f"{enemy.name} senses weakness and goes for the kill!")
-
-            # General action decision
-            if enemy.hp / enemy.max_hp < heal_threshold and random.random() < heal_prob:
-                target = min(self.enemies, key=lambda e: e.hp / e.max_hp if e.alive else float('inf'))
-                adjusted_amount = target.heal(20)
-                self.log.append(f"{enemy.name} heals {target.name} for {adjusted_amount} HP")
-                self.animation_state = {"type": "heal", "user": "enemy"}
-                self.animation_timer = 0.5
-                # Adjust probabilities since the enemy healed
-                heal_prob = min(1, heal_prob + 0.1)
-                attack_prob = max(0, attack_prob - 0.05)
-                special_prob = max(0, special_prob - 0.05)
-                did_heal = True
-            elif random.random() < special_prob:
-                alive_players = [i for i, p in enumerate(self.players) if p.alive]
-                if not alive_players:
-                    self.log.append(f"{enemy.name} has no targets to attack!")
-                    self.turn = "player"
-                    return
-                target_idx = random.choice(alive_players)
-                if random.random() < 0.3:
-                    self.players[target_idx].apply_status("poison", 3)
-                    self.log.append(f"{enemy.name} poisons {self.players[target_idx].name}")
-                else:
-                    damage = self.players[target_idx].take_damage(enemy.attack * 2.5)
-                    self.log.append(f"{enemy.name} uses special attack for {damage} damage")
-                self.animation_state = {"type": "special", "user": "enemy", "target_idx": target_idx}
-                self.animation_timer = 1.0
-                # Adjust probabilities since the enemy used a special attack
-                special_prob = min(1, special_prob + 0.2)
-                attack_prob = max(0, attack_prob - 0.1)
-                heal_prob = max(0, heal_prob - 0.1)  # Decrease heal_prob to reflect shift to special attack
-            elif random.random() < attack_prob:
-                alive_players = [i for i, p in enumerate(self.players) if p.alive]
-                if not alive_players:
-                    self.log.append(f"{enemy.name} has no targets to attack!")
-                    self.turn = "player"
-                    return
-                target_idx = random.choice(alive_players)
-                damage = self.players[target_idx].take_damage(enemy.attack)
-                self.log.append(f"{enemy.name} attacks {self.players[target_idx].name} for {damage} damage")
-                self.animation_state = {"type": "attack", "user": "enemy", "target_idx": target_idx}
-                self.animation_timer = 1.0
-                # Adjust probabilities since the enemy attacked
-                attack_prob = min(1, attack_prob + 0.1)
-                heal_prob = max(0, heal_prob - 0.1)
-                special_prob = max(0, special_prob - 0.05)
-            else:
-                enemy.defense += 5
-                self.log.append(f"{enemy.name} defends, boosting defense")
-                self.animation_state = {"type": "defend", "user": "enemy"}
-                self.animation_timer = 0.5
-                # Adjust probabilities since the enemy defended
-                attack_prob = max(0, attack_prob - 0.1)
-                heal_prob = min(1, heal_prob + 0.1)
-                special_prob = max(0, special_prob - 0.05)
-
-        # Additional probability adjustment if the enemy healed
-        if did_heal:
-            heal_prob = min(1, heal_prob + 0.1)  # Further increase heal_prob after healing
-            attack_prob = max(0, attack_prob - 0.05)  # Slightly reduce attack_prob
-            special_prob = max(0, special_prob - 0.05)  # Slightly reduce special_prob
-
-        # Clamp probabilities before storing
-        attack_prob = max(0, min(1, attack_prob))
-        heal_prob = max(0, min(1, heal_prob))
-        special_prob = max(0, min(1, special_prob))
-
-        # Update the enemy's behavior with the clamped probabilities
-        self.current_enemy_behaviors[self.active_enemy] = [
-            attack_prob,
-            heal_prob,
-            heal_threshold,
-            special_prob
-        ]
-
-        self.active_enemy = (self.active_enemy + 1) % len(alive_enemies)
-        self.turn = "player"
-        self.turn_count += 1
-        for p in self.players + self.enemies:
-            p.update_status()
-            p.defense = max(5 if p in self.players else 3, p.defense - 5)
-        self.current_message = self.log[-1]
-        self.message_timer = 1.0
-
-    def is_over(self):
-        players_alive = any(p.alive for p in self.players)
-        enemies_alive = any(e.alive for e in self.enemies)
-        return not players_alive or not enemies_alive
-
-# GA functions
-def initialize_population(size, num_enemies, difficulty="Medium"):
-    adjust = DIFFICULTIES[difficulty]
-    return [[
-        [
-            random.uniform(0.5, 0.9) + adjust["attack_prob_adjust"],
-            random.uniform(0.2, 0.4) + adjust["heal_prob_adjust"],
-            random.uniform(0.2, 0.6),
-            random.uniform(0, 0.2) + adjust["special_prob_adjust"]
-        ]
-        for _ in range(num_enemies)
-    ] for _ in range(size)]
-
-def evaluate_fitness(battle, behaviors, max_turns=5):
-    battle.reset()
-    battle.enemy_behaviors = behaviors
-    action_counts = {"attack": 0, "heal": 0, "special": 0, "defend": 0}
-
-    for _ in range(max_turns):
-        if battle.is_over():
-            break
-        if battle.turn == "player":
-            alive_enemies = [i for i, e in enumerate(battle.enemies) if e.alive]
-            if not alive_enemies:
-                break
-            if any(p.hp / p.max_hp < 0.3 for p in battle.players if p.alive):
-                battle.player_action("heal", 0)
-                action_counts["heal"] += 1
-            elif random.random() < 0.2:
-                target_idx = random.choice(alive_enemies)
-                battle.player_action("special", target_idx)
-                action_counts["special"] += 1
-            elif random.random() < 0.7:
-                target_idx = random.choice(alive_enemies)
-                battle.player_action("attack", target_idx)
-                action_counts["attack"] += 1
-            else:
-                battle.player_action("defend", 0)
-                action_counts["defend"] += 1
-        else:
-            battle.enemy_action()
-
-    duration_score = abs(battle.turn_count - 10) / 10
-    hp_score = (sum(p.hp for p in battle.players if p.alive) / sum(p.max_hp for p in battle.players) - 0.3) / 0.3 * 2
-    variety_score = 1 - (max(action_counts.values()) / (sum(action_counts.values()) + 1))
-    enemy_hp_score = (sum(e.hp for e in battle.enemies if e.alive) / sum(e.max_hp for e in battle.enemies) - 0.3) / 0.3
-    win_score = 0 if any(p.alive for p in battle.players) else 2
-    fitness = duration_score + max(0, hp_score) + 0.5 * variety_score + win_score + max(0, -enemy_hp_score)
-    return fitness, battle.turn_count, sum(p.hp for p in battle.players if p.alive)
-
-def tournament_select(population, fitness_scores):
-    tournament = random.sample(list(zip(population, fitness_scores)), 3)
-    return min(tournament, key=lambda x: x[1])[0]
-
-def crossover(parent1, parent2):
-    return [
-        [p1 if random.random() < 0.5 else p2 for p1, p2 in zip(b1, b2)]
-        for b1, b2 in zip(parent1, parent2)
-    ]
+# Static layers: the parts of the screen that depend only on the theme and the layout
+# constants, composited once per theme and then drawn with a single blit
+def build_background(theme):
+    theme_colors = THEMES[theme]
+    layer = pygame.Surface((WIDTH, HEIGHT)).convert()
+    layer.fill(theme_colors["battle_background"], (0, 0, BATTLE_WIDTH, HEIGHT))
+    vs_text = VS_FONT.render("VS", True, theme_colors["vs_color"])
+    layer.blit(vs_text, vs_text.get_rect(center=(BATTLE_WIDTH // 2, HEIGHT // 2)))
+    layer.fill(theme_colors["info_bg"], (BATTLE_WIDTH, 0, INFO_WIDTH, HEIGHT))
+    return layer
 
-def mutate(individual, battle):
-    if not battle.player_action_history:
-        return [[min(1, max(0, gene + random.uniform(-0.02, 0.02))) for gene in behavior] for behavior in individual]
-
-    heal_ratio = battle.player_action_history.count("heal") / len(battle.player_action_history)
-    attack_ratio = battle.player_action_history.count("attack") / len(battle.player_action_history)
-
-    mutated = []
-    for behavior in individual:
-        new_behavior = []
-        for i, gene in enumerate(behavior):
-            if i == 0:
-                adjustment = 0.1 if attack_ratio > 0.5 else -0.1
-            elif i == 1:
-                adjustment = 0.05 if any(e.hp / e.max_hp < 0.5 for e in battle.enemies if e.alive) else 0
-            elif i == 2:
-                adjustment = random.uniform(-0.02, 0.02)
-            elif i == 3:
-                adjustment = 0.1 if heal_ratio > 0.5 else -0.1
-            new_gene = min(1, max(0, gene + adjustment + random.uniform(-0.02, 0.02)))
-            new_behavior.append(new_gene)
-        mutated.append(new_behavior)
-    return mutated
+def build_box_frame(theme, box):
+    theme_colors = THEMES[theme]
+    layer = pygame.Surface((box[2] + 2 * BOX_MARGIN, box[3] + 2 * BOX_MARGIN)).convert()
+    layer.fill(theme_colors["menu_border"])
+    inner = (BOX_MARGIN, BOX_MARGIN, box[2], box[3])
+    pygame.draw.rect(layer, theme_colors["text_box_bg"], inner)
+    pygame.draw.rect(layer, theme_colors["text_box_border"], inner, 2)
+    return layer
+
+def build_particle(theme):
+    radius = 5 * SCALE_FACTOR
+    layer = pygame.Surface((2 * radius, 2 * radius), pygame.SRCALPHA).convert_alpha()
+    pygame.draw.circle(layer, THEMES[theme]["particle_color"], (radius, radius), radius)
+    return layer
+
+def build_dropdown(theme, box):
+    theme_colors = THEMES[theme]
+    layer = pygame.Surface(box[2:], pygame.SRCALPHA).convert_alpha()
+    pygame.draw.rect(layer, theme_colors["button_idle"], (0, 0, box[2], box[3]), border_radius=2)
+    pygame.draw.rect(layer, theme_colors["button_border"], (0, 0, box[2], box[3]), 2, border_radius=2)
+    return layer
+
+LAYER_CACHE = LayerCache({
+    "background": build_background,
+    "message_box": partial(build_box_frame, box=MESSAGE_BOX),
+    "menu_box": partial(build_box_frame, box=MENU_BOX),
+    "theme_dropdown": partial(build_dropdown, box=THEME_DROPDOWN),
+    "difficulty_dropdown": partial(build_dropdown, box=DIFFICULTY_DROPDOWN),
+    "particle": build_particle
+}, LAYER_CACHE_BYTES)
 
 # GUI drawing with enhanced animations
-def draw_battle(screen, battle, time_delta, training=False, training_progress=0, current_gen=0, total_gens=2, theme="Light"):
+def draw_battle(view, battle, time_delta, training=False, training_progress=0, current_gen=0, total_gens=2, theme="Light"):
     theme_colors = THEMES[theme]
-    screen.fill(theme_colors["battle_background"])
-
-    vs_text = VS_FONT.render("VS", True, theme_colors["vs_color"])
-    vs_rect = vs_text.get_rect(center=(BATTLE_WIDTH // 2, HEIGHT // 2))
-    screen.blit(vs_text, vs_rect)
+    view.widget("background")
+    view.blit(LAYER_CACHE.get("background", theme), (0, 0))
 
     if training:
-        label = FONT.render(f"Training AI... Gen {current_gen + 1}/{total_gens} ({training_progress:.0%})", True, theme_colors["text"])
-        screen.blit(label, (BATTLE_WIDTH // 2 - 100 * SCALE_FACTOR, HEIGHT // 2 - 20 * SCALE_FACTOR))
+        view.widget("training")
+        label = TEXT_CACHE.render(FONT, f"Training AI... Gen {current_gen + 1}/{total_gens} ({training_progress:.0%})", True, theme_colors["text"])
+        view.blit(label, (BATTLE_WIDTH // 2 - 100 * SCALE_FACTOR, HEIGHT // 2 - 20 * SCALE_FACTOR))
         bar_width = 200 * SCALE_FACTOR
         bar_height = 20 * SCALE_FACTOR
         progress_width = bar_width * training_progress
-        pygame.draw.rect(screen, theme_colors["progress_bg"], (BATTLE_WIDTH // 2 - 100 * SCALE_FACTOR, HEIGHT // 2 + 10 * SCALE_FACTOR, bar_width, bar_height))
-        pygame.draw.rect(screen, theme_colors["progress_bar"], (BATTLE_WIDTH // 2 - 100 * SCALE_FACTOR, HEIGHT // 2 + 10 * SCALE_FACTOR, progress_width, bar_height))
+        view.rect(theme_colors["progress_bg"], (BATTLE_WIDTH // 2 - 100 * SCALE_FACTOR, HEIGHT // 2 + 10 * SCALE_FACTOR, bar_width, bar_height))
+        view.rect(theme_colors["progress_bar"], (BATTLE_WIDTH // 2 - 100 * SCALE_FACTOR, HEIGHT // 2 + 10 * SCALE_FACTOR, progress_width, bar_height))
         return []
 
     player_pos = [(250 * SCALE_FACTOR, 600 * SCALE_FACTOR), (200 * SCALE_FACTOR, 650 * SCALE_FACTOR)]
@@ -673,33 +284,23 @@ def draw_battle(screen, battle, time_delta, training=False, training_progress=0,
                 user_char.position_offset = [offset, 0]
             elif action_type == "special":
                 target_char.flash_timer = 0.5
-                if len(target_char.particles) < 10:
-                    for _ in range(5):
-                        target_char.particles.append({
-                            "pos": list(target_pos),
-                            "vel": [random.uniform(-50, 50), random.uniform(-50, 50)],
-                            "timer": 0.5
-                        })
+                owner = target_idx if user == "enemy" else len(battle.players) + target_idx
+                if PARTICLES.live(owner) < SPECIAL_PARTICLES:
+                    PARTICLES.emit(SPECIAL_PARTICLES // 2, target_pos, 50 * SCALE_FACTOR, 0.5, owner)
             elif action_type == "heal":
                 user_char.glow_timer = 0.5
             elif action_type == "defend":
                 user_char.shake_timer = 0.5
 
-    for char in battle.players + battle.enemies:
-        new_particles = []
-        for particle in char.particles:
-            particle["pos"][0] += particle["vel"][0] * time_delta
-            particle["pos"][1] += particle["vel"][1] * time_delta
-            particle["timer"] -= time_delta
-            if particle["timer"] > 0:
-                new_particles.append(particle)
-        char.particles = new_particles
-        for particle in char.particles:
-            pygame.draw.circle(screen, theme_colors["particle_color"], particle["pos"], 5 * SCALE_FACTOR)
+    view.widget("particles")
+    PARTICLES.update(time_delta)
+    if PARTICLES.count:
+        view.blits(LAYER_CACHE.get("particle", theme), (PARTICLES.positions() - 5 * SCALE_FACTOR).astype(int))
 
     for i, player in enumerate(battle.players):
         if not player.alive:
             continue
+        view.widget(f"player{i}")
         color = RED if player.flash_timer > 0 else theme_colors["player_color"]
         border_color = BLACK
         offset_x = player.shake_offset + player.position_offset[0]
@@ -709,29 +310,29 @@ def draw_battle(screen, battle, time_delta, training=False, training_progress=0,
 
         if player.glow_timer > 0:
             glow_radius = radius + 10 * SCALE_FACTOR * (1 + 0.2 * np.sin(pygame.time.get_ticks() / 100))
-            pygame.draw.circle(screen, theme_colors["heal_glow"], center, glow_radius, 2)
+            view.circle(theme_colors["heal_glow"], center, glow_radius, 2)
             player.glow_timer -= time_delta
 
-        pygame.draw.circle(screen, border_color, center, radius + 2)
-        pygame.draw.circle(screen, color, center, radius)
+        view.circle(border_color, center, radius + 2)
+        view.circle(color, center, radius)
 
-        name_label = SMALL_FONT.render(player.name, True, theme_colors["text"])
+        name_label = TEXT_CACHE.render(SMALL_FONT, player.name, True, theme_colors["text"])
         name_rect = name_label.get_rect(center=(center[0], center[1] - 60 * SCALE_FACTOR))
-        screen.blit(name_label, name_rect)
+        view.blit(name_label, name_rect)
 
         hp_rect = (player_pos[i][0] - 60 * SCALE_FACTOR, player_pos[i][1] - 40 * SCALE_FACTOR, 120 * SCALE_FACTOR, 40 * SCALE_FACTOR)
-        pygame.draw.rect(screen, theme_colors["text_box_bg"], hp_rect)
-        pygame.draw.rect(screen, theme_colors["text_box_border"], hp_rect, 2)
+        view.rect(theme_colors["text_box_bg"], hp_rect)
+        view.rect(theme_colors["text_box_border"], hp_rect, 2)
         hp_ratio = player.hp / player.max_hp
-        pygame.draw.rect(screen, theme_colors["hp_bar"], (hp_rect[0] + 2, hp_rect[1] + 20 * SCALE_FACTOR, 116 * SCALE_FACTOR * hp_ratio, 10 * SCALE_FACTOR))
-        label = SMALL_FONT.render(f"HP: {player.hp}/{player.max_hp}", True, theme_colors["text"])
-        screen.blit(label, (hp_rect[0] + 5 * SCALE_FACTOR, hp_rect[1] + 5 * SCALE_FACTOR))
+        view.rect(theme_colors["hp_bar"], (hp_rect[0] + 2, hp_rect[1] + 20 * SCALE_FACTOR, 116 * SCALE_FACTOR * hp_ratio, 10 * SCALE_FACTOR))
+        label = TEXT_CACHE.render(SMALL_FONT, f"HP: {player.hp:g}/{player.max_hp}", True, theme_colors["text"])
+        view.blit(label, (hp_rect[0] + 5 * SCALE_FACTOR, hp_rect[1] + 5 * SCALE_FACTOR))
 
-        if "poison" in player.status:
-            pygame.draw.circle(screen, theme_colors["status_glow"], center, 20 * SCALE_FACTOR)
+        if player.has_status("poison"):
+            view.circle(theme_colors["status_glow"], center, 20 * SCALE_FACTOR)
         if player.shake_timer > 0:
             player.shake_timer -= time_delta
-            player.shake_offset = random.randint(-5, 5) if player.shake_timer > 0 else 0
+            player.shake_offset = FX_RNG.randint(-5, 5) if player.shake_timer > 0 else 0
         if player.flash_timer > 0:
             player.flash_timer -= time_delta
         player.position_offset = [0, 0]
@@ -739,6 +340,7 @@ def draw_battle(screen, battle, time_delta, training=False, training_progress=0,
     for i, enemy in enumerate(battle.enemies):
         if not enemy.alive:
             continue
+        view.widget(f"enemy{i}")
         color = RED if enemy.flash_timer > 0 else theme_colors["enemy_color"]
         border_color = BLACK
         offset_x = enemy.shake_offset + enemy.position_offset[0]
@@ -748,29 +350,29 @@ def draw_battle(screen, battle, time_delta, training=False, training_progress=0,
 
         if enemy.glow_timer > 0:
             glow_radius = radius + 10 * SCALE_FACTOR * (1 + 0.2 * np.sin(pygame.time.get_ticks() / 100))
-            pygame.draw.circle(screen, theme_colors["heal_glow"], center, glow_radius, 2)
+            view.circle(theme_colors["heal_glow"], center, glow_radius, 2)
             enemy.glow_timer -= time_delta
 
-        pygame.draw.circle(screen, border_color, center, radius + 2)
-        pygame.draw.circle(screen, color, center, radius)
+        view.circle(border_color, center, radius + 2)
+        view.circle(color, center, radius)
 
-        name_label = SMALL_FONT.render(enemy.name, True, theme_colors["text"])
+        name_label = TEXT_CACHE.render(SMALL_FONT, enemy.name, True, theme_colors["text"])
         name_rect = name_label.get_rect(center=(center[0], center[1] - 60 * SCALE_FACTOR))
-        screen.blit(name_label, name_rect)
+        view.blit(name_label, name_rect)
 
         hp_rect = (enemy_pos[i][0] - 60 * SCALE_FACTOR, enemy_pos[i][1] - 40 * SCALE_FACTOR, 120 * SCALE_FACTOR, 40 * SCALE_FACTOR)
-        pygame.draw.rect(screen, theme_colors["text_box_bg"], hp_rect)
-        pygame.draw.rect(screen, theme_colors["text_box_border"], hp_rect, 2)
+        view.rect(theme_colors["text_box_bg"], hp_rect)
+        view.rect(theme_colors["text_box_border"], hp_rect, 2)
         hp_ratio = enemy.hp / enemy.max_hp
-        pygame.draw.rect(screen, theme_colors["hp_bar"], (hp_rect[0] + 2, hp_rect[1] + 20 * SCALE_FACTOR, 116 * SCALE_FACTOR * hp_ratio, 10 * SCALE_FACTOR))
-        label = SMALL_FONT.render(f"HP: {enemy.hp}/{enemy.max_hp}", True, theme_colors["text"])
-        screen.blit(label, (hp_rect[0] + 5 * SCALE_FACTOR, hp_rect[1] + 5 * SCALE_FACTOR))
+        view.rect(theme_colors["hp_bar"], (hp_rect[0] + 2, hp_rect[1] + 20 * SCALE_FACTOR, 116 * SCALE_FACTOR * hp_ratio, 10 * SCALE_FACTOR))
+        label = TEXT_CACHE.render(SMALL_FONT, f"HP: {enemy.hp:g}/{enemy.max_hp}", True, theme_colors["text"])
+        view.blit(label, (hp_rect[0] + 5 * SCALE_FACTOR, hp_rect[1] + 5 * SCALE_FACTOR))
 
-        if "stun" in enemy.status:
-            pygame.draw.circle(screen, theme_colors["status_glow"], center, 20 * SCALE_FACTOR)
+        if enemy.has_status("stun"):
+            view.circle(theme_colors["status_glow"], center, 20 * SCALE_FACTOR)
         if enemy.shake_timer > 0:
             enemy.shake_timer -= time_delta
-            enemy.shake_offset = random.randint(-5, 5) if enemy.shake_timer > 0 else 0
+            enemy.shake_offset = FX_RNG.randint(-5, 5) if enemy.shake_timer > 0 else 0
         if enemy.flash_timer > 0:
             enemy.flash_timer -= time_delta
         enemy.position_offset = [0, 0]
@@ -780,24 +382,22 @@ def draw_battle(screen, battle, time_delta, training=False, training_progress=0,
         if battle.message_timer <= 0:
             battle.current_message = None
 
-    text_rect = (20 * SCALE_FACTOR, HEIGHT - 240 * SCALE_FACTOR, BATTLE_WIDTH - 40 * SCALE_FACTOR, 100 * SCALE_FACTOR)
-    pygame.draw.rect(screen, theme_colors["menu_border"], (text_rect[0] - 5 * SCALE_FACTOR, text_rect[1] - 5 * SCALE_FACTOR, text_rect[2] + 10 * SCALE_FACTOR, text_rect[3] + 10 * SCALE_FACTOR))
-    pygame.draw.rect(screen, theme_colors["text_box_bg"], text_rect)
-    pygame.draw.rect(screen, theme_colors["text_box_border"], text_rect, 2)
+    view.widget("message")
+    text_rect = MESSAGE_BOX
+    view.blit(LAYER_CACHE.get("message_box", theme), (text_rect[0] - BOX_MARGIN, text_rect[1] - BOX_MARGIN))
     if battle.current_message:
-        text = SMALL_FONT.render(battle.current_message, True, theme_colors["text"])
-        screen.blit(text, (text_rect[0] + 10 * SCALE_FACTOR, text_rect[1] + 10 * SCALE_FACTOR))
+        text = TEXT_CACHE.render(SMALL_FONT, battle.current_message, True, theme_colors["text"])
+        view.blit(text, (text_rect[0] + 10 * SCALE_FACTOR, text_rect[1] + 10 * SCALE_FACTOR))
     elif battle.turn == "player" and not battle.animation_state:
-        text = SMALL_FONT.render("What will you do?", True, theme_colors["text"])
-        screen.blit(text, (text_rect[0] + 10 * SCALE_FACTOR, text_rect[1] + 10 * SCALE_FACTOR))
+        text = TEXT_CACHE.render(SMALL_FONT, "What will you do?", True, theme_colors["text"])
+        view.blit(text, (text_rect[0] + 10 * SCALE_FACTOR, text_rect[1] + 10 * SCALE_FACTOR))
 
+    view.widget("menu")
     buttons = []
     mouse_pos = pygame.mouse.get_pos()
     if battle.turn == "player" and not battle.animation_state and not battle.current_message:
-        menu_rect = (20 * SCALE_FACTOR, HEIGHT - 120 * SCALE_FACTOR, BATTLE_WIDTH - 40 * SCALE_FACTOR, 100 * SCALE_FACTOR)
-        pygame.draw.rect(screen, theme_colors["menu_border"], (menu_rect[0] - 5 * SCALE_FACTOR, menu_rect[1] - 5 * SCALE_FACTOR, menu_rect[2] + 10 * SCALE_FACTOR, menu_rect[3] + 10 * SCALE_FACTOR))
-        pygame.draw.rect(screen, theme_colors["text_box_bg"], menu_rect)
-        pygame.draw.rect(screen, theme_colors["text_box_border"], menu_rect, 2)
+        menu_rect = MENU_BOX
+        view.blit(LAYER_CACHE.get("menu_box", theme), (menu_rect[0] - BOX_MARGIN, menu_rect[1] - BOX_MARGIN))
 
         actions = []
         for i, enemy in enumerate(battle.enemies):
@@ -815,148 +415,186 @@ def draw_battle(screen, battle, time_delta, training=False, training_progress=0,
             rect = (x, y, 160 * SCALE_FACTOR, 30 * SCALE_FACTOR)
             is_hovered = rect[0] <= mouse_pos[0] < rect[0] + rect[2] and rect[1] <= mouse_pos[1] < rect[1] + rect[3]
             color = theme_colors["button_hover"] if is_hovered else theme_colors["button_idle"]
-            pygame.draw.rect(screen, color, rect)
-            pygame.draw.rect(screen, theme_colors["button_border"], rect, 1)
-            label = SMALL_FONT.render(text, True, theme_colors["text"])
+            view.rect(color, rect)
+            view.rect(theme_colors["button_border"], rect, 1)
+            label = TEXT_CACHE.render(SMALL_FONT, text, True, theme_colors["text"])
             label_rect = label.get_rect(center=(rect[0] + rect[2] // 2, rect[1] + rect[3] // 2))
-            screen.blit(label, label_rect)
+            view.blit(label, label_rect)
             buttons.append((action, target_idx, rect))
 
     return buttons
 
-def draw_info(screen, battle, generation, best_fitness, log, theme="Light"):
+def draw_info(view, battle, generation, best_fitness, log, theme="Light", retrain_progress=None):
     theme_colors = THEMES[theme]
-    info_surface = pygame.Surface((INFO_WIDTH, HEIGHT))
-    info_surface.fill(theme_colors["info_bg"])
-
+    view.widget("info_stats")
     y_offset = 20 * SCALE_FACTOR
-    info_surface.blit(FONT.render(f"Gen: {generation}", True, theme_colors["info_text"]), (10 * SCALE_FACTOR, y_offset))
+    view.blit(TEXT_CACHE.render(FONT, f"Gen: {generation}", True, theme_colors["info_text"]), (BATTLE_WIDTH + 10 * SCALE_FACTOR, y_offset))
     y_offset += 40 * SCALE_FACTOR
-    info_surface.blit(FONT.render(f"Fitness: {best_fitness:.2f}", True, theme_colors["info_text"]), (10 * SCALE_FACTOR, y_offset))
+    view.blit(TEXT_CACHE.render(FONT, f"Fitness: {best_fitness:.2f}", True, theme_colors["info_text"]), (BATTLE_WIDTH + 10 * SCALE_FACTOR, y_offset))
+    if retrain_progress is not None:
+        view.blit(TEXT_CACHE.render(SMALL_FONT, f"Retraining AI... {retrain_progress:.0%}", True, theme_colors["info_text"]), (BATTLE_WIDTH + 300 * SCALE_FACTOR, y_offset + 5 * SCALE_FACTOR))
     y_offset += 50 * SCALE_FACTOR
 
+    view.widget("info_behaviors")
     labels = ["attack_prob", "heal_prob", "heal_threshold", "special_prob"]
     for i, (enemy_name, behavior) in enumerate(zip(["Goblin", "Wolf"], battle.current_enemy_behaviors)):
         behavior_str = ", ".join(f"{label}={value:.2f}" for label, value in zip(labels, behavior))
-        text = SMALL_FONT.render(f"{enemy_name}: {behavior_str}", True, theme_colors["info_text"])
-        info_surface.blit(text, (10 * SCALE_FACTOR, y_offset))
+        text = TEXT_CACHE.render(SMALL_FONT, f"{enemy_name}: {behavior_str}", True, theme_colors["info_text"])
+        view.blit(text, (BATTLE_WIDTH + 10 * SCALE_FACTOR, y_offset))
         y_offset += 30 * SCALE_FACTOR
 
     y_offset += 30 * SCALE_FACTOR
-    info_surface.blit(FONT.render("Statuses:", True, theme_colors["info_text"]), (10 * SCALE_FACTOR, y_offset))
+    view.widget("info_statuses")
+    view.blit(TEXT_CACHE.render(FONT, "Statuses:", True, theme_colors["info_text"]), (BATTLE_WIDTH + 10 * SCALE_FACTOR, y_offset))
     y_offset += 40 * SCALE_FACTOR
     for char in battle.players + battle.enemies:
         status_text = f"{char.name}: {'Dead' if not char.alive else (', '.join(f'{k}:{v}' for k, v in char.status.items()) or 'None')}"
-        text = SMALL_FONT.render(status_text, True, theme_colors["info_text"])
-        info_surface.blit(text, (10 * SCALE_FACTOR, y_offset))
+        text = TEXT_CACHE.render(SMALL_FONT, status_text, True, theme_colors["info_text"])
+        view.blit(text, (BATTLE_WIDTH + 10 * SCALE_FACTOR, y_offset))
         y_offset += 30 * SCALE_FACTOR
 
     y_offset += 30 * SCALE_FACTOR
-    info_surface.blit(FONT.render("Battle Log:", True, theme_colors["info_text"]), (10 * SCALE_FACTOR, y_offset))
+    view.widget("info_log")
+    view.blit(TEXT_CACHE.render(FONT, "Battle Log:", True, theme_colors["info_text"]), (BATTLE_WIDTH + 10 * SCALE_FACTOR, y_offset))
     y_offset += 40 * SCALE_FACTOR
-    for i, entry in enumerate(log[-5:]):
-        text = SMALL_FONT.render(entry, True, theme_colors["info_text"])
-        info_surface.blit(text, (10 * SCALE_FACTOR, y_offset + i * 40 * SCALE_FACTOR))
-
-    screen.blit(info_surface, (BATTLE_WIDTH, 0))
+    for i, entry in enumerate(log.tail(5)):
+        text = TEXT_CACHE.render(SMALL_FONT, entry, True, theme_colors["info_text"])
+        view.blit(text, (BATTLE_WIDTH + 10 * SCALE_FACTOR, y_offset + i * 40 * SCALE_FACTOR))
 
-def draw_theme_selector(screen, current_theme, theme_dropdown_open, theme_hovered, theme="Light"):
+def draw_theme_selector(view, current_theme, theme_dropdown_open, theme_hovered, theme="Light"):
     theme_colors = THEMES[theme]
-    dropdown_rect = (BATTLE_WIDTH + 10 * SCALE_FACTOR, 10 * SCALE_FACTOR, 220 * SCALE_FACTOR, 40 * SCALE_FACTOR)
+    dropdown_rect = THEME_DROPDOWN
     options = list(THEMES.keys())
 
-    pygame.draw.rect(screen, theme_colors["button_idle"], dropdown_rect, border_radius=2)
-    pygame.draw.rect(screen, theme_colors["button_border"], dropdown_rect, 2, border_radius=2)
-    label = SMALL_FONT.render(f"Theme: {current_theme}", True, theme_colors["text"])
+    view.widget("theme_selector")
+    view.blit(LAYER_CACHE.get("theme_dropdown", theme), dropdown_rect)
+    label = TEXT_CACHE.render(SMALL_FONT, f"Theme: {current_theme}", True, theme_colors["text"])
     label_rect = label.get_rect(center=(dropdown_rect[0] + dropdown_rect[2] // 2, dropdown_rect[1] + dropdown_rect[3] // 2))
-    screen.blit(label, label_rect)
+    view.blit(label, label_rect)
 
     theme_buttons = []
     if theme_dropdown_open:
         for i, option in enumerate(options):
             option_rect = (dropdown_rect[0], dropdown_rect[1] + (i + 1) * 40 * SCALE_FACTOR, 220 * SCALE_FACTOR, 40 * SCALE_FACTOR)
             color = theme_colors["button_hover"] if i == theme_hovered else theme_colors["button_idle"]
-            pygame.draw.rect(screen, color, option_rect, border_radius=2)
-            pygame.draw.rect(screen, theme_colors["button_border"], option_rect, 2, border_radius=2)
-            label = SMALL_FONT.render(option, True, theme_colors["text"])
+            view.rect(color, option_rect, border_radius=2)
+            view.rect(theme_colors["button_border"], option_rect, 2, border_radius=2)
+            label = TEXT_CACHE.render(SMALL_FONT, option, True, theme_colors["text"])
             label_rect = label.get_rect(center=(option_rect[0] + option_rect[2] // 2, option_rect[1] + option_rect[3] // 2))
-            screen.blit(label, label_rect)
+            view.blit(label, label_rect)
             theme_buttons.append((option, option_rect))
 
     return theme_buttons
 
-def draw_difficulty_selector(screen, current_difficulty, difficulty_dropdown_open, difficulty_hovered, theme="Light"):
+def draw_difficulty_selector(view, current_difficulty, difficulty_dropdown_open, difficulty_hovered, theme="Light"):
     theme_colors = THEMES[theme]
-    dropdown_rect = (BATTLE_WIDTH + 240 * SCALE_FACTOR, 10 * SCALE_FACTOR, 180 * SCALE_FACTOR, 40 * SCALE_FACTOR)
+    dropdown_rect = DIFFICULTY_DROPDOWN
     options = list(DIFFICULTIES.keys())
 
-    pygame.draw.rect(screen, theme_colors["button_idle"], dropdown_rect, border_radius=2)
-    pygame.draw.rect(screen, theme_colors["button_border"], dropdown_rect, 2, border_radius=2)
-    label = SMALL_FONT.render(f"Difficulty: {current_difficulty}", True, theme_colors["text"])
+    view.widget("difficulty_selector")
+    view.blit(LAYER_CACHE.get("difficulty_dropdown", theme), dropdown_rect)
+    label = TEXT_CACHE.render(SMALL_FONT, f"Difficulty: {current_difficulty}", True, theme_colors["text"])
     label_rect = label.get_rect(center=(dropdown_rect[0] + dropdown_rect[2] // 2, dropdown_rect[1] + dropdown_rect[3] // 2))
-    screen.blit(label, label_rect)
+    view.blit(label, label_rect)
 
     difficulty_buttons = []
     if difficulty_dropdown_open:
         for i, option in enumerate(options):
             option_rect = (dropdown_rect[0], dropdown_rect[1] + (i + 1) * 40 * SCALE_FACTOR, 180 * SCALE_FACTOR, 40 * SCALE_FACTOR)
             color = theme_colors["button_hover"] if i == difficulty_hovered else theme_colors["button_idle"]
-            pygame.draw.rect(screen, color, option_rect, border_radius=2)
-            pygame.draw.rect(screen, theme_colors["button_border"], option_rect, 2, border_radius=2)
-            label = SMALL_FONT.render(option, True, theme_colors["text"])
+            view.rect(color, option_rect, border_radius=2)
+            view.rect(theme_colors["button_border"], option_rect, 2, border_radius=2)
+            label = TEXT_CACHE.render(SMALL_FONT, option, True, theme_colors["text"])
             label_rect = label.get_rect(center=(option_rect[0] + option_rect[2] // 2, option_rect[1] + option_rect[3] // 2))
-            screen.blit(label, label_rect)
+            view.blit(label, label_rect)
             difficulty_buttons.append((option, option_rect))
 
     return difficulty_buttons
 
+# The difficulty's Pareto front from train.py --pareto, or None when none was evolved
+# for it at the retraining horizon
+def load_preset_front(difficulty):
+    cached = load_front(front_path(difficulty), difficulty, RETRAIN_MAX_TURNS)
+    return ParetoFront(cached.genomes, cached.objectives) if cached is not None and len(cached.genomes) else None
+
+# True while the battle screen changes by itself from frame to frame, so the main
+# loop has to keep ticking rather than wait for input
+def animating(battle):
+    return bool(
+        battle.animation_state or battle.message_timer > 0 or PARTICLES.count
+        or any(c.flash_timer > 0 or c.shake_timer > 0 or c.glow_timer > 0 for c in battle.players + battle.enemies)
+    )
+
 def main():
     clock = pygame.time.Clock()
+    renderer = DirtyRenderer(SCREEN)
     current_difficulty = "Medium"
-    players = [
-        Character("Hero", 100, 15, 5, "dps"),
-        Character("Mage", 80, 12, 3, "healer")
-    ]
     enemies = [
         Character("Goblin", 80, 15, 5, "dps", current_difficulty),
         Character("Wolf", 60, 12, 4, "support", current_difficulty)
     ]
-    sim_battle = Battle(players, enemies, [])
-    population = initialize_population(5, len(enemies), current_difficulty)
+    seed = SEED if SEED is not None else random.SystemRandom().randrange(2 ** 32)
+    battle_rng = spawn_rng(seed, "battle")
+    log_file = open(LOG_FILE, "a") if LOG_FILE else None
+    events = EventLog(EVENT_LOG_LEVEL, open(EVENT_LOG_FILE, "a") if EVENT_LOG_FILE else sys.stdout)
+    events.info("Seed: %d", seed)
+    evaluator = CachedEvaluator(make_evaluator(EVALUATOR_BACKEND))
+    frame_budget = FrameBudget(TRAINING_FRAME_BUDGET)
+    trainer = BackgroundTrainer(evaluator, None if RETRAIN_IN_BACKGROUND else frame_budget)
+    prescreen = Prescreen(make_surrogate(SURROGATE), rng=derive_seed(seed, "surrogate")) if SURROGATE else None
+    screening = None
+    enemy_controller = MCTSController(MCTS_TIME_BUDGET, rng=spawn_rng(seed, "mcts")) if ENEMY_CONTROLLER == "mcts" else None
+    optimizer = make_optimizer(OPTIMIZER, len(enemies), current_difficulty, derive_seed(seed, "ga"), population_size=5)
     generation = 0
-    best_fitness = float('inf')
-    best_behavior = population[0]
+    best_fitness = optimizer.best_fitness
+    best_behavior = optimizer.best_behavior
     training = True
     training_generations = 2
     current_gen = 0
     training_progress = 0
     fitness_scores = []
-    current_eval_idx = 0
+    training_run = None
+    unsaved_generations = 0
+    checkpoint = load_checkpoint(checkpoint_path(current_difficulty))
+    front = load_preset_front(current_difficulty)
+    if checkpoint is not None:
+        # Warm start: skip the training phase entirely
+        optimizer.warm_start(checkpoint.population, checkpoint.best_behavior, checkpoint.best_fitness)
+        best_behavior = checkpoint.best_behavior
+        best_fitness = checkpoint.best_fitness
+        generation = checkpoint.generation
+        fitness_scores = checkpoint.fitness_scores
+        training = False
+    elif front is not None:
+        # No checkpoint yet: start from the difficulty's preset on its Pareto front
+        best_behavior, best_fitness = front.preset(current_difficulty)
+        optimizer.warm_start(front.preset_population(current_difficulty, optimizer.population_size), best_behavior, best_fitness)
+        training = False
     current_theme = "Retro"
     theme_dropdown_open = False
     theme_hovered = -1
     difficulty_dropdown_open = False
     difficulty_hovered = -1
 
-    battle = Battle(
-        [Character("Hero", 100, 15, 5, "dps"), Character("Mage", 80, 12, 3, "healer")],
-        [Character("Goblin", 80, 15, 5, "dps", current_difficulty),
-         Character("Wolf", 60, 12, 4, "support", current_difficulty)],
-        best_behavior
-    )
+    battle = make_battle(current_difficulty, best_behavior, battle_rng, LogBuffer(sink=log_file), events)
     running = True
     enemy_turn_pending = False
     player_action_allowed = True
+    idle = False
+    idle_seconds = 0.0
+    started = time.perf_counter()
 
     while running:
-        time_delta = clock.tick(30) / 1000.0
-        buttons = draw_battle(SCREEN, battle, time_delta, training, training_progress, current_gen, training_generations, current_theme)
-        draw_info(SCREEN, battle, generation, best_fitness, battle.log, current_theme)
-        theme_buttons = draw_theme_selector(SCREEN, current_theme, theme_dropdown_open, theme_hovered, current_theme)
-        difficulty_buttons = draw_difficulty_selector(SCREEN, current_difficulty, difficulty_dropdown_open, difficulty_hovered, current_theme)
-        pygame.display.flip()
+        time_delta = clock.tick(FPS) / 1000.0
+        TEXT_CACHE.use_theme(current_theme)
+        buttons = draw_battle(renderer, battle, time_delta, training, training_progress, current_gen, training_generations, current_theme)
+        draw_info(renderer, battle, generation, best_fitness, battle.log, current_theme, trainer.progress())
+        theme_buttons = draw_theme_selector(renderer, current_theme, theme_dropdown_open, theme_hovered, current_theme)
+        difficulty_buttons = draw_difficulty_selector(renderer, current_difficulty, difficulty_dropdown_open, difficulty_hovered, current_theme)
+        changed = renderer.present()
 
         mouse_pos = pygame.mouse.get_pos()
+        hovered = (theme_hovered, difficulty_hovered)
         theme_hovered = -1
         difficulty_hovered = -1
         for i, (_, rect) in enumerate(theme_buttons):
@@ -969,14 +607,14 @@ def main():
         if enemy_turn_pending and not battle.animation_state and not battle.current_message:
             if not battle.is_over():
                 while True:
-                    alive_enemies = [i for i, e in enumerate(battle.enemies) if e.alive]
+                    alive_enemies = battle.enemy_party.alive_indices
                     if not alive_enemies:
                         break
                     battle.active_enemy = 0
                     battle.active_enemy = alive_enemies[battle.active_enemy % len(alive_enemies)]
                     enemy = battle.enemies[battle.active_enemy]
-                    if "stun" not in enemy.status:
-                        battle.enemy_action()
+                    if not enemy.has_status("stun"):
+                        battle.enemy_action(enemy_controller.choose(battle) if enemy_controller is not None else None)
                         break
                     else:
                         battle.log.append(f"{enemy.name} is stunned and skips its turn")
@@ -987,12 +625,24 @@ def main():
             enemy_turn_pending = False
             player_action_allowed = True
 
-        for event in pygame.event.get():
+        # Nothing moving and nothing in flight: block until input arrives instead of
+        # redrawing an unchanged screen FPS times a second. The clock is restarted after
+        # the wait so the next frame's time_delta does not include the time spent idle.
+        waited = []
+        if idle:
+            idle_start = time.perf_counter()
+            waited = [pygame.event.wait(IDLE_WAIT_MS)]
+            idle_seconds += time.perf_counter() - idle_start
+            clock.tick()
+
+        for event in waited + pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
+            elif event.type == pygame.WINDOWEXPOSED:
+                renderer.invalidate()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 x, y = event.pos
-                theme_dropdown_rect = (BATTLE_WIDTH + 10 * SCALE_FACTOR, 10 * SCALE_FACTOR, 220 * SCALE_FACTOR, 40 * SCALE_FACTOR)
+                theme_dropdown_rect = THEME_DROPDOWN
                 if theme_dropdown_rect[0] <= x < theme_dropdown_rect[0] + theme_dropdown_rect[2] and theme_dropdown_rect[1] <= y < theme_dropdown_rect[1] + theme_dropdown_rect[3]:
                     theme_dropdown_open = not theme_dropdown_open
                     difficulty_dropdown_open = False
@@ -1002,28 +652,43 @@ def main():
                             current_theme = option
                             theme_dropdown_open = False
                             break
-                difficulty_dropdown_rect = (BATTLE_WIDTH + 240 * SCALE_FACTOR, 10 * SCALE_FACTOR, 180 * SCALE_FACTOR, 40 * SCALE_FACTOR)
+                difficulty_dropdown_rect = DIFFICULTY_DROPDOWN
                 if difficulty_dropdown_rect[0] <= x < difficulty_dropdown_rect[0] + difficulty_dropdown_rect[2] and difficulty_dropdown_rect[1] <= y < theme_dropdown_rect[1] + theme_dropdown_rect[3]:
                     difficulty_dropdown_open = not difficulty_dropdown_open
                     theme_dropdown_open = False
                 elif difficulty_dropdown_open:
                     for option, rect in difficulty_buttons:
                         if rect[0] <= x < rect[0] + rect[2] and rect[1] <= y < rect[1] + rect[3]:
+                            if unsaved_generations:
+                                save_checkpoint(
+                                    checkpoint_path(current_difficulty), optimizer.population, best_behavior, best_fitness, generation, fitness_scores
+                                )
+                                unsaved_generations = 0
                             current_difficulty = option
                             difficulty_dropdown_open = False
-                            battle = Battle(
-                                [Character("Hero", 100, 15, 5, "dps"), Character("Mage", 80, 12, 3, "healer")],
-                                [Character("Goblin", 80, 15, 5, "dps", current_difficulty),
-                                 Character("Wolf", 60, 12, 4, "support", current_difficulty)],
-                                best_behavior
-                            )
-                            sim_battle = Battle(
-                                [Character("Hero", 100, 15, 5, "dps"), Character("Mage", 80, 12, 3, "healer")],
-                                [Character("Goblin", 80, 15, 5, "dps", current_difficulty),
-                                 Character("Wolf", 60, 12, 4, "support", current_difficulty)],
-                                []
+                            trainer.cancel()
+                            training_run = None
+                            if prescreen is not None:
+                                prescreen.clear()
+                            optimizer = make_optimizer(
+                                OPTIMIZER, len(enemies), current_difficulty, derive_seed(seed, "ga", current_difficulty), population_size=5
                             )
-                            population = initialize_population(5, len(enemies), current_difficulty)
+                            best_fitness = optimizer.best_fitness
+                            best_behavior = optimizer.best_behavior
+                            checkpoint = load_checkpoint(checkpoint_path(current_difficulty))
+                            front = load_preset_front(current_difficulty)
+                            if checkpoint is not None:
+                                optimizer.warm_start(checkpoint.population, checkpoint.best_behavior, checkpoint.best_fitness)
+                                best_behavior = checkpoint.best_behavior
+                                best_fitness = checkpoint.best_fitness
+                                generation = checkpoint.generation
+                                fitness_scores = checkpoint.fitness_scores
+                            elif front is not None:
+                                best_behavior, best_fitness = front.preset(current_difficulty)
+                                optimizer.warm_start(
+                                    front.preset_population(current_difficulty, optimizer.population_size), best_behavior, best_fitness
+                                )
+                            battle = make_battle(current_difficulty, best_behavior, battle_rng, LogBuffer(sink=log_file), events)
                             break
                 elif not training and battle.turn == "player" and not battle.animation_state and player_action_allowed:
                     if battle.current_message:
@@ -1032,7 +697,7 @@ def main():
                     else:
                         for action, target_idx, (bx, by, bw, bh) in buttons:
                             if bx <= x < bx + bw and by <= y < by + bh:
-                                print(f"Button clicked: {action}")
+                                events.debug("Button clicked: %s", action)
                                 if "attack" in action:
                                     battle.player_action("attack", target_idx)
                                 elif "special" in action:
@@ -1045,75 +710,111 @@ def main():
                                 player_action_allowed = False
 
         if training:
-            if current_eval_idx < len(population):
-                fitness_scores.append(evaluate_fitness(sim_battle, population[current_eval_idx]))
-                current_eval_idx += 1
-                training_progress = current_eval_idx / len(population)
-            else:
+            if training_run is None:
+                training_run = GenerationRun(evaluator, optimizer.ask(), current_difficulty, 5, derive_seed(seed, generation))
+            finished = frame_budget.run(training_run.step)
+            training_progress = training_run.progress
+            if finished:
+                fitness_scores = training_run.fitness_scores
+                optimizer.tell(training_run.population, fitness_scores, battle)
+                training_run = None
                 best_idx = np.argmin([f[0] for f in fitness_scores])
-                best_fitness = fitness_scores[best_idx][0]
-                best_behavior = population[best_idx]
-                new_population = [best_behavior]
-                while len(new_population) < len(population):
-                    parent1 = tournament_select(population, [f[0] for f in fitness_scores])
-                    parent2 = tournament_select(population, [f[0] for f in fitness_scores])
-                    child = crossover(parent1, parent2)
-                    child = mutate(child, battle)
-                    new_population.append(child)
-                population = new_population
+                best_fitness = optimizer.best_fitness
+                best_behavior = optimizer.best_behavior
                 generation += 1
                 current_gen += 1
-                print(f"Generation {generation}: Best fitness = {best_fitness:.2f}, Turns = {fitness_scores[best_idx][1]}, Player HP = {fitness_scores[best_idx][2]}")
-                fitness_scores = []
-                current_eval_idx = 0
+                events.info(
+                    "Generation %d: Best fitness = %.2f, Turns = %s, Player HP = %s, Cache hit rate = %.0f%%",
+                    generation, best_fitness, fitness_scores[best_idx][1], fitness_scores[best_idx][2], 100 * evaluator.cache.hit_rate()
+                )
                 training_progress = 0
                 if current_gen >= training_generations:
                     training = False
-                    battle = Battle(
-                        [Character("Hero", 100, 15, 5, "dps"), Character("Mage", 80, 12, 3, "healer")],
-                        [Character("Goblin", 80, 15, 5, "dps", current_difficulty),
-                         Character("Wolf", 60, 12, 4, "support", current_difficulty)],
-                        best_behavior
-                    )
-                else:
-                    best_fitness = float('inf')
+                    battle = make_battle(current_difficulty, best_behavior, battle_rng, LogBuffer(sink=log_file), events)
+                    save_checkpoint(checkpoint_path(current_difficulty), optimizer.population, best_behavior, best_fitness, generation, fitness_scores)
 
-        if not training and battle.turn_count >= battle.last_ga_turn + 5 and battle.turn == "player" and not battle.is_over():
-            battle.last_ga_turn = battle.turn_count
-            sim_battle = Battle(
-                [Character("Hero", 100, 15, 5, "dps"), Character("Mage", 80, 12, 3, "healer")],
-                [Character("Goblin", 80, 15, 5, "dps", current_difficulty),
-                 Character("Wolf", 60, 12, 4, "support", current_difficulty)],
-                []
-            )
-            fitness_scores = [evaluate_fitness(sim_battle, beh, max_turns=15) for beh in population]
+        # Pick up a finished background generation; everything it changes is swapped in here at once
+        result = trainer.poll()
+        if result is not None:
+            fitness_scores = result.fitness_scores
             best_idx = np.argmin([f[0] for f in fitness_scores])
-            if fitness_scores[best_idx][0] < best_fitness:
-                best_fitness = fitness_scores[best_idx][0]
-                best_behavior = population[best_idx]
+            if prescreen is not None:
+                prescreen.record(screening, result.population, fitness_scores)
+            # Candidates only count as an improvement over the live behaviors' score from
+            # the same position, not over the best score ever seen from any position
+            optimizer.rescore(result.incumbent_score[0])
+            best_fitness = optimizer.best_fitness
+            if optimizer.tell(result.population, fitness_scores, battle):
+                best_fitness = optimizer.best_fitness
+                best_behavior = optimizer.best_behavior
                 battle.enemy_behaviors = best_behavior
                 battle.current_enemy_behaviors = [list(beh) for beh in best_behavior]
-            new_population = [best_behavior]
-            while len(new_population) < len(population):
-                parent1 = tournament_select(population, [f[0] for f in fitness_scores])
-                parent2 = tournament_select(population, [f[0] for f in fitness_scores])
-                child = crossover(parent1, parent2)
-                child = mutate(child, battle)
-                new_population.append(child)
-            population = new_population
             generation += 1
-            print(f"Generation {generation}: Best fitness = {best_fitness:.2f}, Turns = {fitness_scores[best_idx][1]}, Player HP = {fitness_scores[best_idx][2]}")
+            events.info(
+                "Generation %d: Best fitness = %.2f, Turns = %s, Player HP = %s, Cache hit rate = %.0f%%",
+                generation, best_fitness, fitness_scores[best_idx][1], fitness_scores[best_idx][2], 100 * evaluator.cache.hit_rate()
+            )
+            if prescreen is not None:
+                events.info(
+                    "Surrogate: %d of %d candidates not simulated, %d of %d audited rejections wrong, prediction error %.3f",
+                    prescreen.simulations_saved, prescreen.candidates, prescreen.wrong_rejections, prescreen.audits,
+                    prescreen.mean_abs_error()
+                )
+            # Saved on a difficulty switch or at exit rather than here, to keep the disk write
+            # and fsync off the frame loop
+            unsaved_generations += 1
+
+        if not training and battle.turn_count >= battle.last_ga_turn + 5 and battle.turn == "player" and not battle.is_over():
+            battle.last_ga_turn = battle.turn_count
+            candidates = optimizer.ask()
+            if prescreen is not None:
+                screening = prescreen.screen(candidates)
+                candidates = candidates[screening.simulate]
+            trainer.submit(
+                candidates, battle, current_difficulty, max_turns=RETRAIN_MAX_TURNS, seed=derive_seed(seed, generation),
+                incumbent=best_behavior
+            )
 
         if not training and battle.is_over():
             battle.log.append(f"Battle over: {'Player wins' if any(p.alive for p in battle.players) else 'Enemy wins'}")
-            battle = Battle(
-                [Character("Hero", 100, 15, 5, "dps"), Character("Mage", 80, 12, 3, "healer")],
-                [Character("Goblin", 80, 15, 5, "dps", current_difficulty),
-                 Character("Wolf", 60, 12, 4, "support", current_difficulty)],
-                best_behavior
-            )
+            battle = make_battle(current_difficulty, best_behavior, battle_rng, LogBuffer(sink=log_file), events)
             player_action_allowed = True
 
+        # One write per frame at most, whatever was logged during it
+        events.flush()
+
+        idle = not (
+            changed or hovered != (theme_hovered, difficulty_hovered) or training or trainer.busy()
+            or enemy_turn_pending or animating(battle)
+        )
+
+    if unsaved_generations:
+        save_checkpoint(checkpoint_path(current_difficulty), optimizer.population, best_behavior, best_fitness, generation, fitness_scores)
+    if getattr(evaluator.inner, "eliminated", None) is not None:
+        events.info(
+            "Racing: %d genomes eliminated, %d of %d rollouts simulated",
+            evaluator.inner.eliminated, evaluator.inner.rollouts_used, evaluator.inner.rollouts_budget
+        )
+    events.info("Main loop: %.0f%% of the session idle waiting for input", 100 * idle_seconds / (time.perf_counter() - started))
+    events.info(
+        "Renderer: %d of %d frames idle, %.1f%% of the screen updated per frame",
+        renderer.idle_frames, renderer.frames, 100 * renderer.pixels_updated / max(1, renderer.frames) / (WIDTH * HEIGHT)
+    )
+    events.info(
+        "Theme layers: %d built, %d evicted, %.1f MB held",
+        LAYER_CACHE.builds, LAYER_CACHE.evictions, LAYER_CACHE.bytes / 2 ** 20
+    )
+    events.info(
+        "Text cache: hit rate = %.0f%%, %d rendered, %d evicted",
+        100 * TEXT_CACHE.hit_rate(), TEXT_CACHE.misses, TEXT_CACHE.evictions
+    )
+    trainer.close()
+    evaluator.close()
+    if log_file is not None:
+        log_file.close()
+    events.close()
+    if EVENT_LOG_FILE:
+        events.sink.close()
     pygame.quit()
 
 if __name__ == "__main__":
@@ -0,0 +1,145 @@
+import math
+import random
+import time
+
+from simulation import make_battle, scripted_player_action
+
+ENEMY_ACTIONS = ("attack", "special", "heal", "defend")
+
+
+# `actor` is the enemy whose decision the node's statistics are for
+class Node:
+    __slots__ = ("visits", "value", "children", "actor")
+
+    def __init__(self, actor=None):
+        self.visits = 0
+        self.value = 0.0
+        self.children = [None] * len(ENEMY_ACTIONS)
+        self.actor = actor
+
+
+# The enemy that acts on the battle's next enemy turn, following enemy_action's rotation
+def next_actor(battle):
+    alive = battle.enemy_party.alive_indices
+    return alive[battle.active_enemy % len(alive)] if alive else None
+
+
+# Score of a position for the enemies: 1 for a win, 0 for a loss, otherwise 0.5 plus
+# half the difference between the enemies' and the players' remaining HP fractions
+def enemy_reward(battle):
+    if not battle.player_party.alive_indices:
+        return 1.0
+    if not battle.enemy_party.alive_indices:
+        return 0.0
+    return 0.5 + 0.5 * (battle.enemy_party.hp_ratio() - battle.player_party.hp_ratio())
+
+
+# Anytime open-loop MCTS over the active enemy's four actions. Each iteration restores
+# a private battle from a snapshot of the live one, descends the tree by UCB1 with the
+# scripted player from evaluate_fitness answering every enemy move, and finishes with a
+# rollout in which the enemies follow their current evolved behaviors (the GA genome).
+# choose() stops when time_budget seconds are spent. When the next decision follows on
+# from the previous one, the subtree under the chosen action becomes the new root, but
+# only if it was built for the enemy acting now: the simulated battle rotates enemies,
+# while the live game may hand the next turn to a different one.
+class MCTSController:
+    def __init__(self, time_budget=0.02, rollout_turns=10, exploration=1.4, rng=None, clock=time.monotonic):
+        self.time_budget = time_budget
+        self.rollout_turns = rollout_turns
+        self.exploration = exploration
+        self.rng = rng if rng is not None else random.Random()
+        self.clock = clock
+        self.sims = {}
+        self.state = None
+        self.root = None
+        self.battle = None
+        self.decided_at = None
+        self.last_code = None
+        self.iterations = 0
+        self.reused_visits = 0
+
+    def _sim(self, battle):
+        difficulty = battle.enemies[0].difficulty
+        if difficulty not in self.sims:
+            self.sims[difficulty] = make_battle(difficulty)
+            self.sims[difficulty].rng = self.rng
+        return self.sims[difficulty]
+
+    # At least one iteration always runs; after that another one only starts if the
+    # average iteration so far would still finish inside the budget
+    def choose(self, battle):
+        started = self.clock()
+        deadline = started + self.time_budget
+        sim = self._sim(battle)
+        self.state = battle.snapshot(self.state)
+        self.root = self._reuse_root(battle)
+        self.reused_visits = self.root.visits
+        self.iterations = 0
+        while True:
+            self._iterate(sim, self.root)
+            self.iterations += 1
+            now = self.clock()
+            if now + (now - started) / self.iterations >= deadline:
+                break
+
+        visits = [child.visits if child is not None else -1 for child in self.root.children]
+        self.last_code = visits.index(max(visits))
+        self.battle = battle
+        self.decided_at = battle.turn_count
+        return ENEMY_ACTIONS[self.last_code]
+
+    def _reuse_root(self, battle):
+        if self.root is not None and battle is self.battle and battle.turn_count == self.decided_at + 1:
+            child = self.root.children[self.last_code]
+            if child is not None and child.actor == battle.active_enemy:
+                return child
+        return Node(battle.active_enemy)
+
+    def reset(self):
+        self.root = None
+        self.battle = None
+
+    def _iterate(self, sim, root):
+        sim.restore(self.state)
+        path = [root]
+        node = root
+        while not sim.is_over():
+            untried = [code for code, child in enumerate(node.children) if child is None]
+            if untried:
+                code = self.rng.choice(untried)
+                self._play(sim, code)
+                node.children[code] = child = Node(next_actor(sim))
+                path.append(child)
+                break
+            code = self._select(node)
+            node = node.children[code]
+            self._play(sim, code)
+            path.append(node)
+
+        for _ in range(self.rollout_turns):
+            if sim.is_over():
+                break
+            if sim.turn == "player":
+                scripted_player_action(sim, self.rng)
+            else:
+                sim.enemy_action()
+
+        reward = enemy_reward(sim)
+        for visited in path:
+            visited.visits += 1
+            visited.value += reward
+
+    def _select(self, node):
+        log_visits = math.log(node.visits)
+        best, best_score = 0, -math.inf
+        for code, child in enumerate(node.children):
+            score = child.value / child.visits + self.exploration * math.sqrt(log_visits / child.visits)
+            if score > best_score:
+                best, best_score = code, score
+        return best
+
+    # One tree edge: the enemy's move, then the player's reply, up to the next enemy decision
+    def _play(self, sim, code):
+        sim.enemy_action(ENEMY_ACTIONS[code])
+        if not sim.is_over():
+            scripted_player_action(sim, self.rng)
@@ -0,0 +1,158 @@
+import numpy as np
+
+from simulation import ENEMY_SPECS, FITNESS_WEIGHTS, derive_seed
+from batch_sim import evaluate_monte_carlo
+from vector_ga import as_population, random_population, crossover, mutate
+
+# Objective weights behind each difficulty preset, ordered as simulation.OBJECTIVES.
+# Easy cares little about draining the player and more about varied, non-lethal
+# enemies; Hard leans on wearing the player's HP down.
+PRESET_WEIGHTS = {
+    "Easy": (1.0, 0.1, 2.0, 2.0, 1.0),
+    "Medium": FITNESS_WEIGHTS,
+    "Hard": (1.0, 2.0, 0.5, 0.5, 1.0)
+}
+FRONT_MAX_TURNS = 15  # battle length fronts are evolved with: the game's mid-battle retraining horizon
+
+
+# dominates[i, j] is True when row i is no worse than row j in every objective and
+# strictly better in at least one (all objectives minimized). Built a block of rows
+# at a time to bound the size of the temporaries.
+def dominance_matrix(objectives, block=1024):
+    objectives = np.asarray(objectives, dtype=np.float64)
+    n = len(objectives)
+    dominates = np.empty((n, n), dtype=bool)
+    for start in range(0, n, block):
+        rows = objectives[start:start + block, None, :]
+        dominates[start:start + block] = (rows <= objectives[None]).all(axis=2) & (rows < objectives[None]).any(axis=2)
+    return dominates
+
+
+# Pareto rank of every row: 0 for the non-dominated front, 1 for the front that is
+# non-dominated once front 0 is removed, and so on. Each front is peeled off with
+# one vectorized update of the remaining domination counts.
+def non_dominated_sort(objectives):
+    dominates = dominance_matrix(objectives)
+    remaining = dominates.sum(axis=0)
+    rank = np.full(len(remaining), -1)
+    front = np.nonzero(remaining == 0)[0]
+    level = 0
+    while len(front):
+        rank[front] = level
+        remaining -= dominates[front].sum(axis=0)
+        front = np.nonzero((remaining == 0) & (rank < 0))[0]
+        level += 1
+    return rank
+
+
+# NSGA-II crowding distance, computed for all fronts at once: per objective, rows are
+# sorted by (rank, value) so each row's neighbours within its front sit next to it
+def crowding_distance(objectives, rank):
+    objectives = np.asarray(objectives, dtype=np.float64)
+    n, m = objectives.shape
+    distance = np.zeros(n)
+    if n == 0:
+        return distance
+    fronts = rank.max() + 1
+    for k in range(m):
+        order = np.lexsort((objectives[:, k], rank))
+        values, ranks = objectives[order, k], rank[order]
+        first = np.r_[True, ranks[1:] != ranks[:-1]]
+        last = np.r_[ranks[1:] != ranks[:-1], True]
+        low, high = np.zeros(fronts), np.zeros(fronts)
+        low[ranks[first]] = values[first]
+        high[ranks[last]] = values[last]
+        span = high - low
+        span[span == 0] = 1
+        gap = (np.r_[values[1:], values[-1]] - np.r_[values[0], values[:-1]]) / span[ranks]
+        gap[first | last] = np.inf
+        distance[order] += gap
+    return distance
+
+
+# NSGA-II over enemy behaviors. ask() returns offspring bred from the current parents by
+# binary tournament on (rank, crowding); tell() merges evaluated genomes with the parents
+# and keeps the best population_size by rank, then crowding distance.
+class NSGA2:
+    def __init__(self, num_enemies, difficulty="Medium", rng=None, population_size=100, mutation_scale=0.05):
+        self.rng = np.random.default_rng(rng)
+        self.population_size = population_size
+        self.mutation_scale = mutation_scale
+        self.population = random_population(population_size, num_enemies, difficulty, self.rng)
+        self.objectives = None
+        self.rank = None
+        self.crowding = None
+        self.generation = 0
+
+    def ask(self):
+        if self.objectives is None:
+            return self.population.copy()
+        n = len(self.population)
+        a, b = self.rng.integers(0, n, (2, 2, n))
+        better = (self.rank[a] < self.rank[b]) | ((self.rank[a] == self.rank[b]) & (self.crowding[a] > self.crowding[b]))
+        parents = np.where(better, a, b)
+        children = crossover(self.population[parents[0]], self.population[parents[1]], self.rng)
+        return mutate(children, None, self.rng, self.mutation_scale)
+
+    def tell(self, genomes, objectives):
+        genomes = as_population(genomes)
+        objectives = np.asarray(objectives, dtype=np.float64)
+        if self.objectives is not None:
+            genomes = np.concatenate((self.population, genomes))
+            objectives = np.concatenate((self.objectives, objectives))
+        rank = non_dominated_sort(objectives)
+        crowding = crowding_distance(objectives, rank)
+        keep = np.lexsort((-crowding, rank))[:self.population_size]
+        self.population = genomes[keep]
+        self.objectives = objectives[keep]
+        self.rank = non_dominated_sort(self.objectives)
+        self.crowding = crowding_distance(self.objectives, self.rank)
+        self.generation += 1
+
+    def front(self):
+        first = self.rank == 0
+        return ParetoFront(self.population[first], self.objectives[first])
+
+
+# Non-dominated genomes and their objective vectors. The front is ranked for each
+# difficulty preset once up front, so preset() is a lookup; pick() does the same for
+# any other weighting without retraining. The weights only choose the genome: both
+# return (genome, fitness) with fitness weighted by FITNESS_WEIGHTS, the scale the
+# optimizers and retraining compare against.
+class ParetoFront:
+    def __init__(self, genomes, objectives, presets=PRESET_WEIGHTS):
+        self.genomes = as_population(genomes)
+        self.objectives = np.asarray(objectives, dtype=np.float64)
+        self.fitness = self.objectives @ np.asarray(FITNESS_WEIGHTS, dtype=np.float64)
+        self.presets = {name: self._order(weights) for name, weights in presets.items()}
+
+    def _order(self, weights):
+        return np.argsort(self.objectives @ np.asarray(weights, dtype=np.float64), kind="stable")
+
+    def pick(self, weights):
+        best = self._order(weights)[0]
+        return self.genomes[best], float(self.fitness[best])
+
+    def preset(self, name):
+        best = self.presets[name][0]
+        return self.genomes[best], float(self.fitness[best])
+
+    # The `size` genomes ranked best for the preset, to warm-start an optimizer at its
+    # own population size; a front smaller than that is cycled through
+    def preset_population(self, name, size):
+        return self.genomes[np.resize(self.presets[name], size)]
+
+    def __len__(self):
+        return len(self.genomes)
+
+
+# Runs NSGA-II with Monte Carlo objective estimates (common random numbers within a
+# generation) and returns the final Pareto front
+def evolve_front(difficulty="Medium", generations=30, population_size=100, rollouts=32, max_turns=FRONT_MAX_TURNS,
+                 seed=0):
+    optimizer = NSGA2(len(ENEMY_SPECS), difficulty, derive_seed(seed, "nsga2"), population_size)
+    for generation in range(generations):
+        genomes = optimizer.ask()
+        result = evaluate_monte_carlo(genomes, difficulty, rollouts, max_turns, derive_seed(seed, generation))
+        optimizer.tell(genomes, result.objectives)
+    return optimizer.front()
@@ -0,0 +1,136 @@
+import argparse
+
+import numpy as np
+
+from simulation import DIFFICULTIES, ENEMY_SPECS, derive_seed
+from vector_ga import random_population
+from batch_sim import evaluate_monte_carlo
+from evaluators import make_evaluator
+from fitness_cache import CachedEvaluator
+from optimizers import OPTIMIZERS, make_optimizer
+from racing import RacingEvaluator, race
+from surrogate import SURROGATES, Prescreen, make_surrogate
+from training import GenerationRun
+
+
+# Runs one optimizer until `budget` simulated battles are spent. After every generation
+# the current best genome is re-scored on `reference_rollouts` fresh battles, since the
+# optimizer's own best_fitness is biased low by selecting on noisy estimates. Returns
+# (battles, reference_fitness) pairs. With a Prescreen only the candidates it passes
+# are simulated, told to the optimizer, and counted against the budget.
+def convergence(optimizer, evaluator, budget, difficulty="Medium", max_turns=5, seed=0, reference_rollouts=2000,
+                prescreen=None):
+    curve = []
+    battles = 0
+    while battles < budget:
+        genomes = optimizer.ask()
+        if prescreen is not None:
+            screening = prescreen.screen(genomes)
+            genomes = genomes[screening.simulate]
+        used_before = getattr(evaluator, "rollouts_used", None)
+        fitness_scores = evaluator.evaluate(genomes, difficulty, max_turns, derive_seed(seed, optimizer.generation))
+        if used_before is not None:
+            battles += evaluator.rollouts_used - used_before
+        else:
+            battles += len(genomes) * getattr(evaluator, "rollouts", 1)
+        if prescreen is not None:
+            prescreen.record(screening, genomes, fitness_scores)
+        optimizer.tell(genomes, fitness_scores)
+        reference = evaluate_monte_carlo(
+            [optimizer.best_behavior], difficulty, reference_rollouts, max_turns, derive_seed(seed, "reference")
+        )
+        curve.append((battles, float(reference.fitness[0])))
+    return curve
+
+
+# Reference fitness of each optimizer's best genome once a fraction of the budget is
+# spent, averaged over repeats with different seeds. With a surrogate, also returns
+# each optimizer's Prescreen from its last repeat.
+def compare(names, budget, repeats=3, difficulty="Medium", max_turns=5, backend="monte_carlo", points=10,
+            population_size=None, surrogate=None, **evaluator_options):
+    marks = np.linspace(budget / points, budget, points)
+    table = {}
+    screens = {}
+    for name in names:
+        rows = []
+        for repeat in range(repeats):
+            options = {} if population_size is None else {"population_size": population_size}
+            optimizer = make_optimizer(name, len(ENEMY_SPECS), difficulty, derive_seed(repeat, name), **options)
+            prescreen = None
+            if surrogate is not None:
+                prescreen = screens[name] = Prescreen(make_surrogate(surrogate), rng=derive_seed(repeat, "surrogate"))
+            with make_evaluator(backend, **evaluator_options) as evaluator:
+                curve = convergence(optimizer, evaluator, budget, difficulty, max_turns, repeat, prescreen=prescreen)
+            battles = np.array([b for b, _ in curve])
+            fitness = np.array([f for _, f in curve])
+            rows.append([fitness[max(0, np.searchsorted(battles, mark, side="right") - 1)] for mark in marks])
+        table[name] = np.mean(rows, axis=0)
+    return marks, table, screens
+
+
+# One racing generation scored the way the game scores it, through GenerationRun and
+# the fitness cache. Returns the RacingEvaluator so its rollout and elimination counts
+# can be checked: racing only saves work when genomes are raced against each other.
+def racing_generation(population_size=20, difficulty="Medium", max_turns=5, seed=0):
+    racing = RacingEvaluator()
+    optimizer = make_optimizer("ga", len(ENEMY_SPECS), difficulty, derive_seed(seed, "ga"), population_size=population_size)
+    run = GenerationRun(CachedEvaluator(racing), optimizer.ask(), difficulty, max_turns, derive_seed(seed, 0))
+    while not run.step():
+        pass
+    return racing
+
+
+# Races `races` random populations and counts those whose best reported fitness, the
+# elite a GA would keep, belongs to a genome eliminated before the race ended
+def eliminated_elites(races=40, population_size=20, difficulty="Hard", max_turns=5, halving=False):
+    count = 0
+    for seed in range(races):
+        population = random_population(population_size, len(ENEMY_SPECS), difficulty, np.random.default_rng(seed))
+        result = race(population, difficulty, max_turns, seed, halving=halving)
+        count += not result.survived[np.argmin(result.fitness)]
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare optimizers by fitness against simulated battles")
+    parser.add_argument("--optimizers", nargs="+", choices=list(OPTIMIZERS), default=list(OPTIMIZERS))
+    parser.add_argument("--budget", type=int, default=20000, help="simulated battles per run")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES), default="Medium")
+    parser.add_argument("--max-turns", type=int, default=5)
+    parser.add_argument("--rollouts", type=int, default=32, help="Monte Carlo rollouts per genome")
+    parser.add_argument("--population", type=int, default=None, help="genomes per generation")
+    parser.add_argument("--surrogate", choices=list(SURROGATES), default=None,
+                        help="pre-screen candidates with a fitness surrogate")
+    parser.add_argument("--check-racing", action="store_true",
+                        help="check that a racing generation run like the game's eliminates genomes, then exit")
+    args = parser.parse_args(argv)
+
+    if args.check_racing:
+        racing = racing_generation(args.population or 20, args.difficulty, args.max_turns)
+        print(f"racing: {racing.eliminated} genomes eliminated, "
+              f"{racing.rollouts_used} of {racing.rollouts_budget} rollouts simulated")
+        if not racing.eliminated:
+            parser.exit(1, "racing eliminated no genomes\n")
+        for halving in (False, True):
+            elites = eliminated_elites(halving=halving)
+            print(f"racing{' with halving' if halving else ''}: eliminated genome picked as elite in {elites} of 40 races")
+            if elites:
+                parser.exit(1, "racing ranked an eliminated genome first\n")
+        return
+
+    marks, table, screens = compare(
+        args.optimizers, args.budget, args.repeats, args.difficulty, args.max_turns,
+        population_size=args.population, surrogate=args.surrogate, rollouts=args.rollouts
+    )
+    print("battles  " + "".join(f"{name:>10}" for name in table))
+    for i, mark in enumerate(marks):
+        print(f"{int(mark):>7}  " + "".join(f"{table[name][i]:>10.3f}" for name in table))
+    for name, prescreen in screens.items():
+        print(f"{name}: {prescreen.simulations_saved} of {prescreen.candidates} candidates not simulated, "
+              f"{100 * prescreen.wrong_rate():.0f}% of {prescreen.audits} audited rejections wrong, "
+              f"prediction error {prescreen.mean_abs_error():.3f}")
+
+
+if __name__ == "__main__":
+    main()
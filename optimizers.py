@@ -0,0 +1,214 @@
+import math
+
+import numpy as np
+
+from simulation import DIFFICULTIES
+from vector_ga import as_population, random_population, breed, mutation_bias
+
+# Search strategies over enemy behaviors, all driven through the same ask/tell loop:
+#
+#     genomes = optimizer.ask()                       # (n, n_enemies, 4) array
+#     fitness_scores = evaluator.evaluate(genomes, ...)
+#     improved = optimizer.tell(genomes, fitness_scores)
+#
+# tell() accepts any evaluated genomes, not only the ones ask() returned, so migrants
+# from other islands can simply be told along with the optimizer's own candidates.
+# best_behavior / best_fitness track the best genome told so far (fitness is minimized),
+# and population holds the current search state for checkpoints.
+
+
+def _initial_mean(num_enemies, difficulty):
+    adjust = DIFFICULTIES[difficulty]
+    center = np.array([
+        0.7 + adjust["attack_prob_adjust"],
+        0.3 + adjust["heal_prob_adjust"],
+        0.4,
+        0.1 + adjust["special_prob_adjust"]
+    ])
+    return np.tile(np.clip(center, 0, 1), num_enemies)
+
+
+class _Optimizer:
+    def __init__(self, num_enemies, rng):
+        self.num_enemies = num_enemies
+        self.dim = num_enemies * 4
+        self.rng = np.random.default_rng(rng)
+        self.best_behavior = None
+        self.best_fitness = float("inf")
+        self.generation = 0
+
+    def _record(self, genomes, fitness_scores):
+        fitness = np.array([f[0] for f in fitness_scores], dtype=np.float64)
+        best = int(np.argmin(fitness))
+        self.generation += 1
+        if fitness[best] < self.best_fitness:
+            self.best_fitness = float(fitness[best])
+            self.best_behavior = genomes[best].copy()
+            return fitness, True
+        return fitness, False
+
+    # Re-bases best_fitness on the best genome's score under new conditions (e.g. a new
+    # battle position), so tell() compares candidates scored under the same ones
+    def rescore(self, best_fitness):
+        self.best_fitness = best_fitness
+
+    def _shape(self, flat):
+        return np.clip(flat, 0, 1).reshape(len(flat), self.num_enemies, 4)
+
+
+# The game's original GA: elitism, tournament selection, uniform crossover and
+# mutation (history-biased when tell() is given the live battle)
+class GeneticOptimizer(_Optimizer):
+    def __init__(self, num_enemies, difficulty="Medium", rng=None, population_size=20):
+        super().__init__(num_enemies, rng)
+        self.population_size = population_size
+        self.population = random_population(population_size, num_enemies, difficulty, self.rng)
+        self.best_behavior = self.population[0].copy()
+
+    def ask(self):
+        return self.population.copy()
+
+    def tell(self, genomes, fitness_scores, battle=None):
+        genomes = as_population(genomes)
+        _, improved = self._record(genomes, fitness_scores)
+        bias = mutation_bias(battle) if battle is not None else None
+        self.population = breed(genomes, fitness_scores, self.best_behavior, bias, self.rng, self.population_size)
+        return improved
+
+    def warm_start(self, population, best_behavior, best_fitness):
+        self.population = as_population(population)
+        self.population_size = len(self.population)
+        self.best_behavior = as_population([best_behavior])[0]
+        self.best_fitness = best_fitness
+
+
+# CMA-ES with the default (mu/mu_w, lambda) settings. Samples are clipped to [0, 1]
+# and the clipped points are what gets evaluated and learned from. Told genomes far
+# outside the current distribution (e.g. migrants) have their step length capped
+# before they enter the update, as recommended for injected solutions.
+class CMAESOptimizer(_Optimizer):
+    def __init__(self, num_enemies, difficulty="Medium", rng=None, population_size=None, sigma=0.2):
+        super().__init__(num_enemies, rng)
+        d = self.dim
+        self.population_size = population_size or 4 + int(3 * math.log(d))
+        self.sigma0 = sigma
+        self.mean = _initial_mean(num_enemies, difficulty)
+        self.best_behavior = self._shape(self.mean[None])[0]
+        self.chi_n = math.sqrt(d) * (1 - 1 / (4 * d) + 1 / (21 * d ** 2))
+        self._reset_distribution(sigma)
+        self.population = self._shape(self.mean[None])
+
+    def _reset_distribution(self, sigma):
+        d = self.dim
+        self.sigma = sigma
+        self.pc = np.zeros(d)
+        self.ps = np.zeros(d)
+        self.C = np.eye(d)
+        self.B = np.eye(d)
+        self.D = np.ones(d)
+        self.inv_sqrt_C = np.eye(d)
+        self.updates = 0
+
+    def ask(self):
+        z = self.rng.standard_normal((self.population_size, self.dim))
+        self.population = self._shape(self.mean + self.sigma * (z * self.D) @ self.B.T)
+        return self.population.copy()
+
+    def tell(self, genomes, fitness_scores, battle=None):
+        genomes = as_population(genomes)
+        fitness, improved = self._record(genomes, fitness_scores)
+        d, n = self.dim, len(genomes)
+        mu = max(1, n // 2)
+        weights = math.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+        weights /= weights.sum()
+        mu_eff = 1 / np.sum(weights ** 2)
+        cc = (4 + mu_eff / d) / (d + 4 + 2 * mu_eff / d)
+        cs = (mu_eff + 2) / (d + mu_eff + 5)
+        c1 = 2 / ((d + 1.3) ** 2 + mu_eff)
+        cmu = min(1 - c1, 2 * (mu_eff - 2 + 1 / mu_eff) / ((d + 2) ** 2 + mu_eff))
+        damps = 1 + 2 * max(0.0, math.sqrt((mu_eff - 1) / (d + 1)) - 1) + cs
+
+        steps = (genomes.reshape(n, d)[np.argsort(fitness)[:mu]] - self.mean) / self.sigma
+        lengths = np.linalg.norm(steps @ self.inv_sqrt_C, axis=1)
+        cap = math.sqrt(d) + 2 * d / (d + 2)
+        steps *= np.minimum(1.0, cap / np.maximum(lengths, 1e-12))[:, None]
+        step = weights @ steps
+        self.mean = self.mean + self.sigma * step
+
+        self.updates += 1
+        self.ps = (1 - cs) * self.ps + math.sqrt(cs * (2 - cs) * mu_eff) * (self.inv_sqrt_C @ step)
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = ps_norm / math.sqrt(1 - (1 - cs) ** (2 * self.updates)) / self.chi_n < 1.4 + 2 / (d + 1)
+        self.pc = (1 - cc) * self.pc + hsig * math.sqrt(cc * (2 - cc) * mu_eff) * step
+        rank_mu = (steps * weights[:, None]).T @ steps
+        self.C = ((1 - c1 - cmu) * self.C + c1 * (np.outer(self.pc, self.pc) + (not hsig) * cc * (2 - cc) * self.C)
+                  + cmu * rank_mu)
+        self.sigma *= math.exp((cs / damps) * (ps_norm / self.chi_n - 1))
+
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+        self.inv_sqrt_C = self.B @ np.diag(1 / self.D) @ self.B.T
+        return improved
+
+    def warm_start(self, population, best_behavior, best_fitness):
+        self.mean = as_population([best_behavior])[0].reshape(-1)
+        self._reset_distribution(self.sigma0 / 2)
+        self.population = as_population(population)
+        self.best_behavior = as_population([best_behavior])[0]
+        self.best_fitness = best_fitness
+
+
+# Cross-entropy method: sample from an independent Gaussian per gene, refit it to the
+# elite fraction of what was told, and smooth the update. A small floor on the spread
+# keeps the search from collapsing before it has converged.
+class CrossEntropyOptimizer(_Optimizer):
+    def __init__(self, num_enemies, difficulty="Medium", rng=None, population_size=20, elite_fraction=0.2,
+                 smoothing=0.7, std=0.2, min_std=0.01):
+        super().__init__(num_enemies, rng)
+        self.population_size = population_size
+        self.elite_fraction = elite_fraction
+        self.smoothing = smoothing
+        self.std0 = std
+        self.min_std = min_std
+        self.mean = _initial_mean(num_enemies, difficulty)
+        self.std = np.full(self.dim, std)
+        self.best_behavior = self._shape(self.mean[None])[0]
+        self.population = self._shape(self.mean[None])
+
+    def ask(self):
+        samples = self.mean + self.std * self.rng.standard_normal((self.population_size, self.dim))
+        self.population = self._shape(samples)
+        return self.population.copy()
+
+    def tell(self, genomes, fitness_scores, battle=None):
+        genomes = as_population(genomes)
+        fitness, improved = self._record(genomes, fitness_scores)
+        count = max(2, int(round(self.elite_fraction * len(genomes))))
+        elite = genomes.reshape(len(genomes), -1)[np.argsort(fitness)[:count]]
+        s = self.smoothing
+        self.mean = s * elite.mean(axis=0) + (1 - s) * self.mean
+        self.std = np.maximum(self.min_std, s * elite.std(axis=0) + (1 - s) * self.std)
+        return improved
+
+    def warm_start(self, population, best_behavior, best_fitness):
+        population = as_population(population)
+        self.mean = as_population([best_behavior])[0].reshape(-1)
+        if len(population) > 1:
+            self.std = np.maximum(self.min_std, population.reshape(len(population), -1).std(axis=0))
+        self.population = population
+        self.best_behavior = as_population([best_behavior])[0]
+        self.best_fitness = best_fitness
+
+
+OPTIMIZERS = {
+    "ga": GeneticOptimizer,
+    "cmaes": CMAESOptimizer,
+    "cem": CrossEntropyOptimizer
+}
+
+
+def make_optimizer(name="ga", num_enemies=2, difficulty="Medium", rng=None, **options):
+    if name not in OPTIMIZERS:
+        raise ValueError(f"Unknown optimizer: {name}")
+    return OPTIMIZERS[name](num_enemies, difficulty, rng, **options)
@@ -0,0 +1,54 @@
+import numpy as np
+
+
+# Particle effects in preallocated arrays. Live particles occupy the first `count` slots;
+# update() integrates and ages them all at once and compacts the survivors to the front,
+# so dead slots are reused by the next emit() and nothing is allocated per particle.
+# `owner` tags each particle with whatever the caller emitted it for (e.g. the target
+# of a special attack), so effects can be capped per owner.
+class ParticleSystem:
+    def __init__(self, capacity=4096, rng=None):
+        self.capacity = capacity
+        self.pos = np.zeros((capacity, 2))
+        self.vel = np.zeros((capacity, 2))
+        self.life = np.zeros(capacity)
+        self.owner = np.zeros(capacity, dtype=np.int32)
+        self.count = 0
+        self.rng = np.random.default_rng(rng)
+        self.dropped = 0
+
+    # Emits up to n particles at `origin` with velocities uniform in [-speed, speed] per
+    # axis; returns how many fit. Particles that do not fit are dropped and counted.
+    def emit(self, n, origin, speed=50.0, lifetime=0.5, owner=0):
+        start = self.count
+        fitted = min(n, self.capacity - start)
+        self.dropped += n - fitted
+        end = start + fitted
+        self.pos[start:end] = origin
+        self.vel[start:end] = self.rng.uniform(-speed, speed, (fitted, 2))
+        self.life[start:end] = lifetime
+        self.owner[start:end] = owner
+        self.count = end
+        return fitted
+
+    def update(self, dt):
+        n = self.count
+        self.pos[:n] += self.vel[:n] * dt
+        self.life[:n] -= dt
+        alive = self.life[:n] > 0
+        live = int(np.count_nonzero(alive))
+        if live < n:
+            for array in (self.pos, self.vel, self.life, self.owner):
+                array[:live] = array[:n][alive]
+        self.count = live
+
+    def live(self, owner=None):
+        if owner is None:
+            return self.count
+        return int(np.count_nonzero(self.owner[:self.count] == owner))
+
+    def positions(self):
+        return self.pos[:self.count]
+
+    def clear(self):
+        self.count = 0
@@ -0,0 +1,120 @@
+import math
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+
+from batch_sim import BatchBattle, N_DRAWS
+from simulation import derive_seed
+
+RaceResult = namedtuple("RaceResult", "fitness half_width turns player_hp rollouts survived")
+
+
+# F-race style evaluation: the whole population plays rounds of common-random-number
+# rollouts, and after each round any genome whose paired fitness difference to the
+# current leader is significantly worse (fitness is minimized) is dropped. With
+# halving=True the slower half of the survivors is also cut every round, as in
+# successive halving. `survived` marks the genomes still racing at the end. An eliminated
+# genome reports the worse of its own mean and the leader's mean when it was dropped, and
+# always scores worse than the final leader, so picking the elite by fitness can only
+# pick a survivor; its turns, player HP and interval are those it had when dropped.
+def race(population, difficulty="Medium", max_turns=5, seed=None, rollouts_per_round=8, max_rounds=8,
+         confidence=0.95, halving=False, min_survivors=1, start=None):
+    genomes = np.asarray(population, dtype=np.float64)
+    n, per_round = len(genomes), rollouts_per_round
+    fitness = np.zeros((n, max_rounds * per_round))
+    turns = np.zeros_like(fitness)
+    player_hp = np.zeros_like(fitness)
+    rollouts = np.zeros(n, dtype=np.int64)
+    floor = np.full(n, -np.inf)
+    one_sided = NormalDist().inv_cdf(confidence)
+    survivors = np.arange(n)
+
+    for round_idx in range(max_rounds):
+        rng = np.random.default_rng(None if seed is None else derive_seed(seed, round_idx))
+        draws = np.tile(rng.random((per_round, max_turns, N_DRAWS)), (len(survivors), 1, 1))
+        battle = BatchBattle(np.repeat(genomes[survivors], per_round, axis=0), difficulty, start=start)
+        battle.run(max_turns, draws)
+        cols = slice(round_idx * per_round, (round_idx + 1) * per_round)
+        for store, result in zip((fitness, turns, player_hp), battle.fitness()):
+            store[survivors, cols] = result.reshape(len(survivors), per_round)
+        rollouts[survivors] += per_round
+        if len(survivors) <= min_survivors:
+            break
+
+        # Paired comparison against the leader over the rollouts everyone shared
+        played = (round_idx + 1) * per_round
+        scores = fitness[survivors, :played]
+        means = scores.mean(axis=1)
+        leader = np.argmin(means)
+        diffs = scores - scores[leader]
+        if played > 1:
+            margin = one_sided * diffs.std(axis=1, ddof=1) / math.sqrt(played)
+            keep = diffs.mean(axis=1) - margin <= 0
+        else:
+            keep = np.ones(len(survivors), dtype=bool)
+        if halving:
+            cutoff = max(min_survivors, math.ceil(len(survivors) / 2))
+            keep &= np.argsort(np.argsort(means)) < cutoff
+        keep[leader] = True
+        floor[survivors[~keep]] = means[leader]
+        survivors = survivors[keep]
+        if len(survivors) <= min_survivors:
+            break
+
+    two_sided = NormalDist().inv_cdf(0.5 + confidence / 2)
+    mean_fitness = np.array([fitness[i, :rollouts[i]].mean() for i in range(n)])
+    survived = np.zeros(n, dtype=bool)
+    survived[survivors] = True
+    best = np.nextafter(mean_fitness[survivors].min(), np.inf)
+    mean_fitness[~survived] = np.maximum(np.maximum(mean_fitness, floor), best)[~survived]
+    spread = np.array([fitness[i, :rollouts[i]].std(ddof=1) if rollouts[i] > 1 else 0.0 for i in range(n)])
+    return RaceResult(
+        mean_fitness,
+        two_sided * spread / np.sqrt(rollouts),
+        np.array([turns[i, :rollouts[i]].mean() for i in range(n)]),
+        np.array([player_hp[i, :rollouts[i]].mean() for i in range(n)]),
+        rollouts,
+        survived
+    )
+
+
+# Evaluator backend around race(). rollouts_used / rollouts_budget show how much of the
+# flat max_rounds * rollouts_per_round budget per genome was actually simulated, and
+# `eliminated` counts genomes dropped before their race ended.
+class RacingEvaluator:
+    workers = 1
+    batched = True
+
+    def __init__(self, rollouts_per_round=8, max_rounds=8, confidence=0.95, halving=False):
+        self.rollouts_per_round = rollouts_per_round
+        self.max_rounds = max_rounds
+        self.confidence = confidence
+        self.halving = halving
+        self.rollouts_used = 0
+        self.rollouts_budget = 0
+        self.eliminated = 0
+
+    def evaluate(self, population, difficulty="Medium", max_turns=5, seed=None, offset=0, common_random_numbers=True,
+                 start=None):
+        if not len(population):
+            return []
+        result = race(
+            population, difficulty, max_turns, seed, self.rollouts_per_round, self.max_rounds,
+            self.confidence, self.halving, start=start
+        )
+        self.rollouts_used += int(result.rollouts.sum())
+        self.rollouts_budget += len(population) * self.rollouts_per_round * self.max_rounds
+        self.eliminated += int((~result.survived).sum())
+        return list(zip(
+            result.fitness.tolist(), result.turns.tolist(), result.player_hp.tolist(), result.half_width.tolist()
+        ))
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
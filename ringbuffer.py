@@ -0,0 +1,89 @@
+from array import array
+from collections import deque
+
+
+# Fixed-capacity history of small integer action codes. Counts over the whole buffer
+# and over the newest `window` entries are maintained on append, so count() and
+# recent_count() are lookups rather than scans.
+class ActionHistory:
+    __slots__ = ("capacity", "window", "codes", "start", "size", "counts", "recent_counts")
+
+    def __init__(self, capacity=5, window=3, num_codes=4):
+        self.capacity = capacity
+        self.window = window
+        self.codes = array("b", bytes(capacity))
+        self.start = 0
+        self.size = 0
+        self.counts = [0] * num_codes
+        self.recent_counts = [0] * num_codes
+
+    def _at(self, position):
+        return self.codes[(self.start + position) % self.capacity]
+
+    def append(self, code):
+        if self.size >= self.window:
+            self.recent_counts[self._at(self.size - self.window)] -= 1
+        if self.size == self.capacity:
+            self.counts[self.codes[self.start]] -= 1
+            self.codes[self.start] = code
+            self.start = (self.start + 1) % self.capacity
+        else:
+            self.codes[(self.start + self.size) % self.capacity] = code
+            self.size += 1
+        self.counts[code] += 1
+        self.recent_counts[code] += 1
+
+    def count(self, code):
+        return self.counts[code]
+
+    def recent_count(self, code):
+        return self.recent_counts[code]
+
+    def clear(self):
+        self.start = 0
+        self.size = 0
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+            self.recent_counts[i] = 0
+
+    def copy_from(self, other):
+        self.codes[:] = other.codes
+        self.start = other.start
+        self.size = other.size
+        self.counts[:] = other.counts
+        self.recent_counts[:] = other.recent_counts
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return (self._at(i) for i in range(self.size))
+
+
+# Battle log that keeps only the newest `capacity` entries in memory. Every entry can
+# also be streamed to `sink` (any object with write(), e.g. an open text file).
+class LogBuffer:
+    def __init__(self, capacity=50, sink=None):
+        self.entries = deque(maxlen=capacity)
+        self.sink = sink
+
+    def append(self, entry):
+        self.entries.append(entry)
+        if self.sink is not None:
+            self.sink.write(entry + "\n")
+
+    def tail(self, n):
+        start = max(0, len(self.entries) - n)
+        return [self.entries[i] for i in range(start, len(self.entries))]
+
+    def clear(self):
+        self.entries.clear()
+
+    def __getitem__(self, index):
+        return self.entries[index]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __iter__(self):
+        return iter(self.entries)
@@ -0,0 +1,771 @@
+import hashlib
+import random
+from array import array
+from bisect import insort
+
+from eventlog import DEBUG, EventLog
+from ringbuffer import ActionHistory, LogBuffer
+
+# Difficulty Settings
+DIFFICULTIES = {
+    "Easy": {
+        "hp_scale": 0.6,
+        "attack_scale": 0.5,
+        "defense_scale": 0.5,
+        "attack_prob_adjust": -0.2,
+        "heal_prob_adjust": -0.1,
+        "special_prob_adjust": -0.2,
+        "heal_effectiveness": 1.5
+    },
+    "Medium": {
+        "hp_scale": 1.0,
+        "attack_scale": 1.0,
+        "defense_scale": 1.0,
+        "attack_prob_adjust": 0.0,
+        "heal_prob_adjust": 0.0,
+        "special_prob_adjust": 0.0,
+        "heal_effectiveness": 1.0
+    },
+    "Hard": {
+        "hp_scale": 2.0,
+        "attack_scale": 1.8,
+        "defense_scale": 1.6,
+        "attack_prob_adjust": 0.3,
+        "heal_prob_adjust": 0.2,
+        "special_prob_adjust": 0.3,
+        "heal_effectiveness": 0.5
+    }
+}
+
+# Action codes used by histories and the batched engine
+ATTACK, SPECIAL, HEAL, DEFEND = range(4)
+ACTION_CODES = {"attack": ATTACK, "special": SPECIAL, "heal": HEAL, "defend": DEFEND}
+
+# Party rosters: (name, hp, attack, defense, role)
+PLAYER_SPECS = [
+    ("Hero", 100, 15, 5, "dps"),
+    ("Mage", 80, 12, 3, "healer")
+]
+ENEMY_SPECS = [
+    ("Goblin", 80, 15, 5, "dps"),
+    ("Wolf", 60, 12, 4, "support")
+]
+
+# Party state: one compact array per field, indexed by a member's slot. Characters
+# are thin views over these arrays, and alive_indices is kept up to date as members
+# die or are revived, so nothing in a turn has to rebuild it.
+class PartyState:
+    __slots__ = ("hp", "max_hp", "defense", "base_defense", "alive", "poison", "stun", "alive_indices")
+
+    def __init__(self):
+        self.hp = array("d")
+        self.max_hp = array("d")
+        self.defense = array("l")
+        self.base_defense = array("l")
+        self.alive = array("b")
+        self.poison = array("l")
+        self.stun = array("l")
+        self.alive_indices = []
+
+    def add(self, max_hp, defense):
+        index = len(self.hp)
+        self.hp.append(max_hp)
+        self.max_hp.append(max_hp)
+        self.defense.append(defense)
+        self.base_defense.append(defense)
+        self.alive.append(1)
+        self.poison.append(0)
+        self.stun.append(0)
+        self.alive_indices.append(index)
+        return index
+
+    def kill(self, index):
+        if self.alive[index]:
+            self.alive[index] = 0
+            self.alive_indices.remove(index)
+
+    def revive(self, index):
+        if not self.alive[index]:
+            self.alive[index] = 1
+            insort(self.alive_indices, index)
+
+    def reset_member(self, index):
+        self.hp[index] = self.max_hp[index]
+        self.defense[index] = self.base_defense[index]
+        self.poison[index] = 0
+        self.stun[index] = 0
+        self.revive(index)
+
+    def weakest(self):
+        hp, max_hp = self.hp, self.max_hp
+        return min(self.alive_indices, key=lambda i: hp[i] / max_hp[i])
+
+    def hp_ratio(self):
+        hp = self.hp
+        return sum(hp[i] for i in self.alive_indices) / sum(self.max_hp)
+
+    def decay_defense(self, amount, floor):
+        defense = self.defense
+        for i in range(len(defense)):
+            defense[i] = max(floor, defense[i] - amount)
+
+    def copy_from(self, other):
+        for field in ("hp", "max_hp", "defense", "base_defense", "alive", "poison", "stun"):
+            getattr(self, field)[:] = getattr(other, field)
+        self.alive_indices[:] = other.alive_indices
+
+    def clone(self):
+        party = PartyState()
+        party.copy_from(self)
+        return party
+
+STATUSES = ("poison", "stun")
+
+# Game entities
+class Character:
+    __slots__ = (
+        "name", "base_hp", "base_attack", "base_defense", "difficulty", "hp_scale", "attack_scale",
+        "defense_scale", "heal_effectiveness", "max_hp", "attack", "role", "party", "index",
+        "shake_offset", "shake_timer", "flash_timer", "position_offset", "glow_timer"
+    )
+
+    def __init__(self, name, hp, attack, defense, role="dps", difficulty="Medium"):
+        self.name = name
+        self.base_hp = hp
+        self.base_attack = attack
+        self.base_defense = defense
+        self.difficulty = difficulty
+        self.hp_scale = DIFFICULTIES[difficulty]["hp_scale"]
+        self.attack_scale = DIFFICULTIES[difficulty]["attack_scale"]
+        self.defense_scale = DIFFICULTIES[difficulty]["defense_scale"]
+        self.heal_effectiveness = DIFFICULTIES[difficulty]["heal_effectiveness"]
+        self.max_hp = int(hp * self.hp_scale) if role != "dps" and role != "healer" else hp
+        self.attack = int(attack * self.attack_scale) if role != "dps" and role != "healer" else attack
+        self.role = role
+        # A character owns a one-member party until a Battle moves it into a shared one
+        self.party = PartyState()
+        self.index = self.party.add(self.max_hp, int(defense * self.defense_scale) if role != "dps" and role != "healer" else defense)
+        self.shake_offset = 0
+        self.shake_timer = 0
+        self.flash_timer = 0
+        self.position_offset = [0, 0]
+        self.glow_timer = 0
+
+    def join(self, party):
+        old, i = self.party, self.index
+        self.index = party.add(old.max_hp[i], old.base_defense[i])
+        party.hp[self.index] = old.hp[i]
+        party.defense[self.index] = old.defense[i]
+        party.poison[self.index] = old.poison[i]
+        party.stun[self.index] = old.stun[i]
+        if not old.alive[i]:
+            party.kill(self.index)
+        self.party = party
+
+    @property
+    def hp(self):
+        return self.party.hp[self.index]
+
+    @hp.setter
+    def hp(self, value):
+        self.party.hp[self.index] = value
+
+    @property
+    def defense(self):
+        return self.party.defense[self.index]
+
+    @defense.setter
+    def defense(self, value):
+        self.party.defense[self.index] = value
+
+    @property
+    def alive(self):
+        return bool(self.party.alive[self.index])
+
+    @alive.setter
+    def alive(self, value):
+        if value:
+            self.party.revive(self.index)
+        else:
+            self.party.kill(self.index)
+
+    # Active statuses and their remaining durations, for display
+    @property
+    def status(self):
+        return {name: getattr(self.party, name)[self.index] for name in STATUSES if getattr(self.party, name)[self.index] > 0}
+
+    def has_status(self, status):
+        return getattr(self.party, status)[self.index] > 0
+
+    def reset(self):
+        self.party.reset_member(self.index)
+        self.glow_timer = 0
+
+    def apply_status(self, status, duration):
+        getattr(self.party, status)[self.index] = duration
+        self.flash_timer = 0.5
+
+    def update_status(self):
+        party, i = self.party, self.index
+        if party.poison[i] > 0:
+            self.take_damage(5)
+            party.poison[i] -= 1
+        if party.stun[i] > 0:
+            party.stun[i] -= 1
+
+    def take_damage(self, damage):
+        party, i = self.party, self.index
+        actual_damage = max(0, damage - party.defense[i])
+        hp = max(0, party.hp[i] - actual_damage)
+        party.hp[i] = hp
+        if hp == 0:
+            party.kill(i)
+        self.shake_timer = 0.5
+        self.flash_timer = 0.5
+        return actual_damage
+
+    def heal(self, amount):
+        adjusted_amount = int(amount * self.heal_effectiveness)
+        party, i = self.party, self.index
+        party.hp[i] = min(party.max_hp[i], party.hp[i] + adjusted_amount)
+        self.glow_timer = 0.5
+        return adjusted_amount
+
+# Numeric state of a battle: parties, turn bookkeeping, action histories and the
+# adapted enemy behaviors. The log, rng and animation fields are not included.
+class BattleSnapshot:
+    __slots__ = (
+        "player_party", "enemy_party", "turn", "turn_count", "active_player", "active_enemy",
+        "last_ga_turn", "player_action_history", "enemy_action_history", "enemy_behaviors"
+    )
+
+    def __init__(self, num_enemies):
+        self.player_party = PartyState()
+        self.enemy_party = PartyState()
+        self.turn = "player"
+        self.turn_count = 0
+        self.active_player = 0
+        self.active_enemy = 0
+        self.last_ga_turn = -5
+        self.player_action_history = ActionHistory()
+        self.enemy_action_history = [ActionHistory() for _ in range(num_enemies)]
+        self.enemy_behaviors = [[0.0] * 4 for _ in range(num_enemies)]
+
+# Battle system
+class Battle:
+    def __init__(self, players, enemies, enemy_behaviors, rng=random, log=None, events=None):
+        self.players = players
+        self.enemies = enemies
+        self.player_party = PartyState()
+        self.enemy_party = PartyState()
+        for p in players:
+            p.join(self.player_party)
+        for e in enemies:
+            e.join(self.enemy_party)
+        self.enemy_behaviors = enemy_behaviors
+        self.current_enemy_behaviors = [list(beh) for beh in enemy_behaviors]
+        self.turn = "player"
+        self.log = log if log is not None else LogBuffer()
+        self.events = events if events is not None else EventLog()
+        self.turn_count = 0
+        self.active_player = 0
+        self.active_enemy = 0
+        self.last_ga_turn = -5
+        self.player_action_history = ActionHistory()
+        self.enemy_action_history = [ActionHistory() for _ in enemies]
+        self.animation_state = None
+        self.animation_timer = 0
+        self.current_message = None
+        self.message_timer = 0
+        self.rng = rng
+
+    def reset(self):
+        for p in self.players + self.enemies:
+            p.reset()
+        self.turn = "player"
+        self.log.clear()
+        self.turn_count = 0
+        self.active_player = 0
+        self.active_enemy = 0
+        self.last_ga_turn = -5
+        self.player_action_history.clear()
+        for history in self.enemy_action_history:
+            history.clear()
+        self.current_enemy_behaviors = [list(beh) for beh in self.enemy_behaviors]
+        self.animation_state = None
+        self.animation_timer = 0
+        self.current_message = None
+        self.message_timer = 0
+
+    # Copies the numeric state into `into` (or a new snapshot) without allocating
+    # when `into` came from an earlier snapshot() of a battle with the same roster
+    def snapshot(self, into=None):
+        snap = into if into is not None else BattleSnapshot(len(self.enemies))
+        snap.player_party.copy_from(self.player_party)
+        snap.enemy_party.copy_from(self.enemy_party)
+        snap.turn = self.turn
+        snap.turn_count = self.turn_count
+        snap.active_player = self.active_player
+        snap.active_enemy = self.active_enemy
+        snap.last_ga_turn = self.last_ga_turn
+        snap.player_action_history.copy_from(self.player_action_history)
+        for saved, history in zip(snap.enemy_action_history, self.enemy_action_history):
+            saved.copy_from(history)
+        for saved, behavior in zip(snap.enemy_behaviors, self.current_enemy_behaviors):
+            saved[:] = behavior
+        return snap
+
+    # Puts the battle back in a snapshotted position. Characters keep their views, so
+    # the battle can be restored and played out again as often as needed.
+    def restore(self, snap):
+        self.player_party.copy_from(snap.player_party)
+        self.enemy_party.copy_from(snap.enemy_party)
+        self.turn = snap.turn
+        self.turn_count = snap.turn_count
+        self.active_player = snap.active_player
+        self.active_enemy = snap.active_enemy
+        self.last_ga_turn = snap.last_ga_turn
+        self.player_action_history.copy_from(snap.player_action_history)
+        for history, saved in zip(self.enemy_action_history, snap.enemy_action_history):
+            history.copy_from(saved)
+        self.current_enemy_behaviors = [list(beh) for beh in snap.enemy_behaviors]
+
+    def get_first_alive_enemy(self):
+        alive = self.enemy_party.alive_indices
+        return alive[0] if alive else None
+
+    def get_first_alive_player(self):
+        alive = self.player_party.alive_indices
+        return alive[0] if alive else None
+
+    def player_action(self, action, target_idx):
+        alive_players = self.player_party.alive_indices
+        if not alive_players:
+            return
+        num_alive = len(alive_players)
+        self.active_player = alive_players[self.active_player % num_alive]
+        player = self.players[self.active_player]
+
+        if action != "heal" and action != "defend":
+            if not (0 <= target_idx < len(self.enemies) and self.enemy_party.alive[target_idx]):
+                target_idx = self.get_first_alive_enemy()
+                if target_idx is None:
+                    self.log.append("No enemies left to target!")
+                    return
+            self.enemy_action_history[target_idx].append(ACTION_CODES[action])
+
+        self.player_action_history.append(ACTION_CODES[action])
+
+        if action == "attack":
+            damage = self.enemies[target_idx].take_damage(player.attack)
+            self.log.append(f"{player.name} attacks {self.enemies[target_idx].name} for {damage} damage")
+            self.animation_state = {"type": "attack", "user": "player", "target_idx": target_idx}
+            self.animation_timer = 1.0
+        elif action == "defend":
+            player.defense += 5
+            self.log.append(f"{player.name} defends, boosting defense")
+            self.animation_state = {"type": "defend", "user": "player"}
+            self.animation_timer = 0.5
+        elif action == "heal":
+            target = self.players[self.player_party.weakest()]
+            adjusted_amount = target.heal(20)
+            self.log.append(f"{player.name} heals {target.name} for {adjusted_amount} HP")
+            self.animation_state = {"type": "heal", "user": "player"}
+            self.animation_timer = 0.5
+        elif action == "special":
+            if self.rng.random() < 0.3:
+                self.enemies[target_idx].apply_status("stun", 1)
+                self.log.append(f"{player.name} stuns {self.enemies[target_idx].name}")
+            else:
+                damage = self.enemies[target_idx].take_damage(player.attack * 2)
+                self.log.append(f"{player.name} uses special attack for {damage} damage")
+            self.animation_state = {"type": "special", "user": "player", "target_idx": target_idx}
+            self.animation_timer = 1.0
+
+        self.active_player = (self.active_player + 1) % num_alive
+        self.turn = "enemy"
+        self.current_message = self.log[-1]
+        self.message_timer = 1.0
+
+    # The active enemy moves. By default it samples from its evolved behavior plus the
+    # counter-rules below; an external controller can instead pass the action to take.
+    def enemy_action(self, action=None):
+        alive_enemies = self.enemy_party.alive_indices
+        if not alive_enemies:
+            self.log.append("No enemies left to act!")
+            self.turn = "player"
+            return
+        num_alive = len(alive_enemies)
+
+        self.active_enemy = self.active_enemy % num_alive
+        self.active_enemy = alive_enemies[self.active_enemy]
+
+        if self.events.enabled(DEBUG):
+            self.events.debug(
+                "Enemy action: active_enemy=%d, len(enemies)=%d, len(current_enemy_behaviors)=%d, len(enemy_action_history)=%d",
+                self.active_enemy, len(self.enemies), len(self.current_enemy_behaviors), len(self.enemy_action_history)
+            )
+
+        if not (0 <= self.active_enemy < len(self.current_enemy_behaviors)):
+            self.log.append(f"Error: active_enemy {self.active_enemy} out of bounds for current_enemy_behaviors!")
+            self.turn = "player"
+            return
+        if not (0 <= self.active_enemy < len(self.enemy_action_history)):
+            self.log.append(f"Error: active_enemy {self.active_enemy} out of bounds for enemy_action_history!")
+            self.turn = "player"
+            return
+
+        enemy = self.enemies[self.active_enemy]
+        if action is not None:
+            self._enemy_move(enemy, action)
+            self._end_enemy_turn(num_alive)
+            return
+        behavior = self.current_enemy_behaviors[self.active_enemy]
+
+        attack_prob, heal_prob, heal_threshold, special_prob = behavior
+        difficulty_adjust = DIFFICULTIES[enemy.difficulty]
+        attack_prob += difficulty_adjust["attack_prob_adjust"]
+        heal_prob += difficulty_adjust["heal_prob_adjust"]
+        special_prob += difficulty_adjust["special_prob_adjust"]
+
+        # Clamp probabilities immediately after difficulty adjustment
+        attack_prob = max(0, min(1, attack_prob))
+        heal_prob = max(0, min(1, heal_prob))
+        special_prob = max(0, min(1, special_prob))
+
+        recent_actions = self.player_action_history
+        attack_count = recent_actions.recent_count(ATTACK) + recent_actions.recent_count(SPECIAL)
+        heal_count = recent_actions.recent_count(HEAL)
+
+        # Flag to track if the enemy heals during this turn
+        did_heal = False
+
+        if attack_count == 3 and enemy.name == "Goblin":
+            target = self.enemies[self.enemy_party.weakest()]
+            adjusted_amount = target.heal(20)
+            self.log.append(f"{enemy.name} heals {target.name} for {adjusted_amount} HP due to your consecutive attacks!")
+            self.animation_state = {"type": "heal", "user": "enemy"}
+            self.animation_timer = 0.5
+            # Adjust probabilities since the Goblin healed
+            heal_prob = min(1, heal_prob + 0.3)  # Increase heal_prob due to healing action
+            attack_prob = max(0, attack_prob - 0.1)  # Slightly reduce attack_prob
+            special_prob = max(0, special_prob - 0.05)  # Slightly reduce special_prob
+            did_heal = True
+        elif attack_count == 2 and enemy.name == "Goblin":
+            enemy.defense += 5
+            self.log.append(f"{enemy.name} defends due to your consecutive attacks!")
+            self.animation_state = {"type": "defend", "user": "enemy"}
+            self.animation_timer = 0.5
+            # Adjust probabilities since the Goblin defended
+            attack_prob = max(0, attack_prob - 0.1)  # Reduce attack_prob after defending
+            heal_prob = min(1, heal_prob + 0.1)  # Slightly increase heal_prob
+            special_prob = max(0, special_prob - 0.05)  # Slightly reduce special_prob
+        elif heal_count >= 3 and enemy.name == "Goblin":
+            alive_players = self.player_party.alive_indices
+            if not alive_players:
+                self.log.append(f"{enemy.name} has no targets to attack!")
+                self.turn = "player"
+                return
+            target_idx = self.rng.choice(alive_players)
+            self.players[target_idx].apply_status("poison", 3)
+            self.log.append(f"{enemy.name} poisons {self.players[target_idx].name} due to your frequent healing!")
+            damage = self.players[target_idx].take_damage(enemy.attack * 2.5)
+            self.log.append(f"{enemy.name} uses special attack for {damage} damage")
+            self.animation_state = {"type": "special", "user": "enemy", "target_idx": target_idx}
+            self.animation_timer = 1.0
+            # Adjust probabilities since the Goblin used a special attack
+            special_prob = min(1, special_prob + 0.2)  # Increase special_prob
+            attack_prob = max(0, attack_prob - 0.1)  # Slightly reduce attack_prob
+            heal_prob = max(0, heal_prob - 0.1)  # Decrease heal_prob to reflect shift to special attack
+        elif enemy.has_status("stun"):
+            self.log.append(f"{enemy.name} is stunned and skips its turn")
+        else:
+            # General behavior adjustments based on player actions
+            if attack_count >= 2:
+                heal_prob = min(1, heal_prob + 0.4)
+                heal_threshold = max(0.5, heal_threshold - 0.2)
+                self.log.append(f"{enemy.name} notices your aggressive attacks and prepares to heal!")
+            if heal_count >= 2:
+                special_prob = min(1, special_prob + 0.4)
+                self.log.append(f"{enemy.name} notices your frequent healing and prepares a special attack!")
+                heal_prob = max(0, heal_prob - 0.1)  # Decrease heal_prob due to preparing special attack
+
+            # Adjustments based on the enemy's own recent actions
+            recent_attacks = self.enemy_action_history[self.active_enemy]
+            consecutive_attacks = recent_attacks.recent_count(ATTACK) + recent_attacks.recent_count(SPECIAL)
+            if consecutive_attacks >= 3:
+                attack_prob = max(0, attack_prob - 0.3)
+                heal_prob = min(1, heal_prob + 0.2)
+                self.log.append(f"{enemy.name} feels pressured and prepares to heal!")
+            if consecutive_attacks >= 5 and enemy.hp / enemy.max_hp < 0.75:
+                heal_prob = min(1, heal_prob + 0.4)
+                heal_threshold = max(0.5, heal_threshold - 0.2)
+                self.log.append(f"{enemy.name} is heavily damaged and prioritizes healing!")
+
+            # Adjustments based on total player HP
+            total_player_hp = self.player_party.hp_ratio()
+            if total_player_hp < 0.3:
+                attack_prob = min(1, attack_prob + 0.3)
+                special_prob = min(1, special_prob + 0.3)
+                self.log.append(f"{enemy.name} senses weakness and goes for the kill!")
+
+            # General action decision
+            if enemy.hp / enemy.max_hp < heal_threshold and self.rng.random() < heal_prob:
+                target = self.enemies[self.enemy_party.weakest()]
+                adjusted_amount = target.heal(20)
+                self.log.append(f"{enemy.name} heals {target.name} for {adjusted_amount} HP")
+                self.animation_state = {"type": "heal", "user": "enemy"}
+                self.animation_timer = 0.5
+                # Adjust probabilities since the enemy healed
+                heal_prob = min(1, heal_prob + 0.1)
+                attack_prob = max(0, attack_prob - 0.05)
+                special_prob = max(0, special_prob - 0.05)
+                did_heal = True
+            elif self.rng.random() < special_prob:
+                alive_players = self.player_party.alive_indices
+                if not alive_players:
+                    self.log.append(f"{enemy.name} has no targets to attack!")
+                    self.turn = "player"
+                    return
+                target_idx = self.rng.choice(alive_players)
+                if self.rng.random() < 0.3:
+                    self.players[target_idx].apply_status("poison", 3)
+                    self.log.append(f"{enemy.name} poisons {self.players[target_idx].name}")
+                else:
+                    damage = self.players[target_idx].take_damage(enemy.attack * 2.5)
+                    self.log.append(f"{enemy.name} uses special attack for {damage} damage")
+                self.animation_state = {"type": "special", "user": "enemy", "target_idx": target_idx}
+                self.animation_timer = 1.0
+                # Adjust probabilities since the enemy used a special attack
+                special_prob = min(1, special_prob + 0.2)
+                attack_prob = max(0, attack_prob - 0.1)
+                heal_prob = max(0, heal_prob - 0.1)  # Decrease heal_prob to reflect shift to special attack
+            elif self.rng.random() < attack_prob:
+                alive_players = self.player_party.alive_indices
+                if not alive_players:
+                    self.log.append(f"{enemy.name} has no targets to attack!")
+                    self.turn = "player"
+                    return
+                target_idx = self.rng.choice(alive_players)
+                damage = self.players[target_idx].take_damage(enemy.attack)
+                self.log.append(f"{enemy.name} attacks {self.players[target_idx].name} for {damage} damage")
+                self.animation_state = {"type": "attack", "user": "enemy", "target_idx": target_idx}
+                self.animation_timer = 1.0
+                # Adjust probabilities since the enemy attacked
+                attack_prob = min(1, attack_prob + 0.1)
+                heal_prob = max(0, heal_prob - 0.1)
+                special_prob = max(0, special_prob - 0.05)
+            else:
+                enemy.defense += 5
+                self.log.append(f"{enemy.name} defends, boosting defense")
+                self.animation_state = {"type": "defend", "user": "enemy"}
+                self.animation_timer = 0.5
+                # Adjust probabilities since the enemy defended
+                attack_prob = max(0, attack_prob - 0.1)
+                heal_prob = min(1, heal_prob + 0.1)
+                special_prob = max(0, special_prob - 0.05)
+
+        # Additional probability adjustment if the enemy healed
+        if did_heal:
+            heal_prob = min(1, heal_prob + 0.1)  # Further increase heal_prob after healing
+            attack_prob = max(0, attack_prob - 0.05)  # Slightly reduce attack_prob
+            special_prob = max(0, special_prob - 0.05)  # Slightly reduce special_prob
+
+        # Clamp probabilities before storing
+        attack_prob = max(0, min(1, attack_prob))
+        heal_prob = max(0, min(1, heal_prob))
+        special_prob = max(0, min(1, special_prob))
+
+        # Update the enemy's behavior with the clamped probabilities
+        self.current_enemy_behaviors[self.active_enemy] = [
+            attack_prob,
+            heal_prob,
+            heal_threshold,
+            special_prob
+        ]
+
+        self._end_enemy_turn(num_alive)
+
+    # A chosen action with the same effects as the sampled ones; stun still skips the turn
+    def _enemy_move(self, enemy, action):
+        if enemy.has_status("stun"):
+            self.log.append(f"{enemy.name} is stunned and skips its turn")
+        elif action == "heal":
+            target = self.enemies[self.enemy_party.weakest()]
+            adjusted_amount = target.heal(20)
+            self.log.append(f"{enemy.name} heals {target.name} for {adjusted_amount} HP")
+            self.animation_state = {"type": "heal", "user": "enemy"}
+            self.animation_timer = 0.5
+        elif action == "defend":
+            enemy.defense += 5
+            self.log.append(f"{enemy.name} defends, boosting defense")
+            self.animation_state = {"type": "defend", "user": "enemy"}
+            self.animation_timer = 0.5
+        else:
+            target_idx = self.rng.choice(self.player_party.alive_indices)
+            if action == "special":
+                if self.rng.random() < 0.3:
+                    self.players[target_idx].apply_status("poison", 3)
+                    self.log.append(f"{enemy.name} poisons {self.players[target_idx].name}")
+                else:
+                    damage = self.players[target_idx].take_damage(enemy.attack * 2.5)
+                    self.log.append(f"{enemy.name} uses special attack for {damage} damage")
+                self.animation_state = {"type": "special", "user": "enemy", "target_idx": target_idx}
+            else:
+                damage = self.players[target_idx].take_damage(enemy.attack)
+                self.log.append(f"{enemy.name} attacks {self.players[target_idx].name} for {damage} damage")
+                self.animation_state = {"type": "attack", "user": "enemy", "target_idx": target_idx}
+            self.animation_timer = 1.0
+
+    def _end_enemy_turn(self, num_alive):
+        self.active_enemy = (self.active_enemy + 1) % num_alive
+        self.turn = "player"
+        self.turn_count += 1
+        for p in self.players + self.enemies:
+            p.update_status()
+        self.player_party.decay_defense(5, 5)
+        self.enemy_party.decay_defense(5, 3)
+        self.current_message = self.log[-1]
+        self.message_timer = 1.0
+
+    def is_over(self):
+        return not self.player_party.alive_indices or not self.enemy_party.alive_indices
+
+def make_battle(difficulty="Medium", behaviors=(), rng=random, log=None, events=None):
+    players = [Character(*spec) for spec in PLAYER_SPECS]
+    enemies = [Character(*spec, difficulty) for spec in ENEMY_SPECS]
+    return Battle(players, enemies, list(behaviors), rng, log, events)
+
+# Seed spawning: a stable child seed for any path below a master seed, e.g.
+# derive_seed(master, generation, individual). Independent of process and call order.
+def derive_seed(seed, *path):
+    digest = hashlib.blake2b(repr((seed,) + path).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def spawn_rng(seed, *path):
+    return random.Random(derive_seed(seed, *path))
+
+# GA functions
+def initialize_population(size, num_enemies, difficulty="Medium", rng=random):
+    adjust = DIFFICULTIES[difficulty]
+    return [[
+        [
+            rng.uniform(0.5, 0.9) + adjust["attack_prob_adjust"],
+            rng.uniform(0.2, 0.4) + adjust["heal_prob_adjust"],
+            rng.uniform(0.2, 0.6),
+            rng.uniform(0, 0.2) + adjust["special_prob_adjust"]
+        ]
+        for _ in range(num_enemies)
+    ] for _ in range(size)]
+
+# The scripted opponent of evaluate_fitness: heal when anyone is low, otherwise mostly
+# attack. Returns the action taken, or None when there is no enemy left to act on.
+def scripted_player_action(battle, rng):
+    alive_enemies = battle.enemy_party.alive_indices
+    if not alive_enemies:
+        return None
+    party = battle.player_party
+    if any(party.hp[i] / party.max_hp[i] < 0.3 for i in party.alive_indices):
+        action, target_idx = "heal", 0
+    elif rng.random() < 0.2:
+        action, target_idx = "special", rng.choice(alive_enemies)
+    elif rng.random() < 0.7:
+        action, target_idx = "attack", rng.choice(alive_enemies)
+    else:
+        action, target_idx = "defend", 0
+    battle.player_action(action, target_idx)
+    return action
+
+# Fitness objectives, all minimized: distance from a 10-turn battle, player HP left above
+# 30%, lack of player action variety, a player loss, and enemy HP already below 30%.
+# The scalar fitness is their weighted sum.
+OBJECTIVES = ("duration", "player_hp", "variety", "win", "enemy_hp")
+FITNESS_WEIGHTS = (1.0, 1.0, 0.5, 1.0, 1.0)
+
+def weighted_fitness(objectives, weights=FITNESS_WEIGHTS):
+    return sum(w * o for w, o in zip(weights, objectives))
+
+# Plays the scripted player against `behaviors` from a fresh battle, or from the
+# snapshot `start` with `behaviors` taking over the enemies at that position.
+# Returns (objectives, turns, player_hp), objectives ordered as OBJECTIVES.
+def evaluate_objectives(battle, behaviors, max_turns=5, rng=None, start=None):
+    if rng is not None:
+        battle.rng = rng
+    rng = battle.rng
+    battle.enemy_behaviors = behaviors
+    if start is None:
+        battle.reset()
+    else:
+        battle.restore(start)
+        battle.current_enemy_behaviors = [list(beh) for beh in behaviors]
+    action_counts = {"attack": 0, "heal": 0, "special": 0, "defend": 0}
+
+    for _ in range(max_turns):
+        if battle.is_over():
+            break
+        if battle.turn == "player":
+            action = scripted_player_action(battle, rng)
+            if action is None:
+                break
+            action_counts[action] += 1
+        else:
+            battle.enemy_action()
+
+    duration_score = abs(battle.turn_count - 10) / 10
+    hp_score = (battle.player_party.hp_ratio() - 0.3) / 0.3 * 2
+    variety_score = 1 - (max(action_counts.values()) / (sum(action_counts.values()) + 1))
+    enemy_hp_score = (battle.enemy_party.hp_ratio() - 0.3) / 0.3
+    win_score = 0 if battle.player_party.alive_indices else 2
+    objectives = (duration_score, max(0, hp_score), variety_score, win_score, max(0, -enemy_hp_score))
+    player_hp = battle.player_party.hp
+    return objectives, battle.turn_count, sum(player_hp[i] for i in battle.player_party.alive_indices)
+
+def evaluate_fitness(battle, behaviors, max_turns=5, rng=None, start=None):
+    objectives, turns, player_hp = evaluate_objectives(battle, behaviors, max_turns, rng, start)
+    return weighted_fitness(objectives), turns, player_hp
+
+def tournament_select(population, fitness_scores, rng=random):
+    tournament = rng.sample(list(zip(population, fitness_scores)), 3)
+    return min(tournament, key=lambda x: x[1])[0]
+
+def crossover(parent1, parent2, rng=random):
+    return [
+        [p1 if rng.random() < 0.5 else p2 for p1, p2 in zip(b1, b2)]
+        for b1, b2 in zip(parent1, parent2)
+    ]
+
+def mutate(individual, battle, rng=random):
+    if not battle.player_action_history:
+        return [[min(1, max(0, gene + rng.uniform(-0.02, 0.02))) for gene in behavior] for behavior in individual]
+
+    heal_ratio = battle.player_action_history.count(HEAL) / len(battle.player_action_history)
+    attack_ratio = battle.player_action_history.count(ATTACK) / len(battle.player_action_history)
+
+    mutated = []
+    for behavior in individual:
+        new_behavior = []
+        for i, gene in enumerate(behavior):
+            if i == 0:
+                adjustment = 0.1 if attack_ratio > 0.5 else -0.1
+            elif i == 1:
+                adjustment = 0.05 if any(e.hp / e.max_hp < 0.5 for e in battle.enemies if e.alive) else 0
+            elif i == 2:
+                adjustment = rng.uniform(-0.02, 0.02)
+            elif i == 3:
+                adjustment = 0.1 if heal_ratio > 0.5 else -0.1
+            new_gene = min(1, max(0, gene + adjustment + rng.uniform(-0.02, 0.02)))
+            new_behavior.append(new_gene)
+        mutated.append(new_behavior)
+    return mutated
+
+# Elitism plus tournament selection, crossover and mutation
+def breed(population, fitness_scores, elite, battle, rng=random):
+    scores = [f[0] for f in fitness_scores]
+    new_population = [elite]
+    while len(new_population) < len(population):
+        parent1 = tournament_select(population, scores, rng)
+        parent2 = tournament_select(population, scores, rng)
+        child = crossover(parent1, parent2, rng)
+        child = mutate(child, battle, rng)
+        new_population.append(child)
+    return new_population
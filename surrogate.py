@@ -0,0 +1,151 @@
+from collections import namedtuple
+
+import numpy as np
+
+from vector_ga import as_population
+
+Screening = namedtuple("Screening", "simulate predicted audited")
+
+
+# Ridge regression on each gene and its square, fitted from running sufficient
+# statistics (X^T X and X^T y) so an update costs one rank-k product. `decay` < 1
+# discounts older samples as the population moves on.
+class RidgeSurrogate:
+    def __init__(self, alpha=1.0, decay=0.98):
+        self.alpha = alpha
+        self.decay = decay
+        self.xtx = None
+        self.xty = None
+        self.weights = None
+        self.samples = 0
+
+    def _features(self, genomes):
+        genes = as_population(genomes).reshape(len(genomes), -1)
+        return np.column_stack((np.ones(len(genes)), genes, genes ** 2))
+
+    def update(self, genomes, fitness):
+        x = self._features(genomes)
+        if self.xtx is None:
+            self.xtx = np.zeros((x.shape[1], x.shape[1]))
+            self.xty = np.zeros(x.shape[1])
+        self.xtx = self.decay * self.xtx + x.T @ x
+        self.xty = self.decay * self.xty + x.T @ fitness
+        penalty = self.alpha * np.eye(x.shape[1])
+        penalty[0, 0] = 0
+        self.weights = np.linalg.solve(self.xtx + penalty, self.xty)
+        self.samples += len(x)
+
+    def predict(self, genomes):
+        return self._features(genomes) @ self.weights
+
+    def clear(self):
+        self.xtx = self.xty = self.weights = None
+        self.samples = 0
+
+
+# Mean fitness of the k nearest evaluated genomes, kept in a ring buffer of the
+# latest `capacity` samples
+class KNNSurrogate:
+    def __init__(self, k=5, capacity=2000):
+        self.k = k
+        self.capacity = capacity
+        self.genes = None
+        self.fitness = np.zeros(capacity)
+        self.samples = 0
+
+    def update(self, genomes, fitness):
+        genes = as_population(genomes).reshape(len(genomes), -1)[-self.capacity:]
+        fitness = fitness[-self.capacity:]
+        if self.genes is None:
+            self.genes = np.zeros((self.capacity, genes.shape[1]))
+        slots = (self.samples + np.arange(len(genes))) % self.capacity
+        self.genes[slots] = genes
+        self.fitness[slots] = fitness
+        self.samples += len(genes)
+
+    def predict(self, genomes):
+        stored = min(self.samples, self.capacity)
+        genes = as_population(genomes).reshape(len(genomes), -1)
+        distances = ((genes[:, None, :] - self.genes[None, :stored]) ** 2).sum(axis=2)
+        k = min(self.k, stored)
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        return self.fitness[nearest].mean(axis=1)
+
+    def clear(self):
+        self.genes = None
+        self.samples = 0
+
+
+SURROGATES = {
+    "ridge": RidgeSurrogate,
+    "knn": KNNSurrogate
+}
+
+
+def make_surrogate(name="ridge", **options):
+    if name not in SURROGATES:
+        raise ValueError(f"Unknown surrogate: {name}")
+    return SURROGATES[name](**options)
+
+
+# Pre-screens candidates before they reach the battle simulator:
+#
+#     screening = prescreen.screen(genomes)
+#     fitness_scores = evaluator.evaluate(genomes[screening.simulate], ...)
+#     prescreen.record(screening, genomes[screening.simulate], fitness_scores)
+#
+# Once the surrogate has `min_samples` behind it, only the keep_fraction of candidates
+# with the best predicted fitness is simulated. A random `audit_rate` of the rejected
+# ones is simulated as well: an audited rejection is wrong when it beats the worst
+# kept candidate, so wrong_rejections / audits estimates how often screening throws
+# away a child that should have been kept.
+class Prescreen:
+    def __init__(self, surrogate, keep_fraction=0.5, min_samples=20, audit_rate=0.1, rng=None):
+        self.surrogate = surrogate
+        self.keep_fraction = keep_fraction
+        self.min_samples = min_samples
+        self.audit_rate = audit_rate
+        self.rng = np.random.default_rng(rng)
+        self.candidates = 0
+        self.simulated = 0
+        self.audits = 0
+        self.wrong_rejections = 0
+        self.abs_error_sum = 0.0
+        self.predictions = 0
+
+    def screen(self, genomes):
+        n = len(genomes)
+        if self.surrogate.samples < self.min_samples or n < 2:
+            return Screening(np.arange(n), None, np.zeros(0, dtype=int))
+        predicted = self.surrogate.predict(genomes)
+        order = np.argsort(predicted)
+        keep = max(1, int(np.ceil(self.keep_fraction * n)))
+        rejected = order[keep:]
+        audited = rejected[self.rng.random(len(rejected)) < self.audit_rate]
+        return Screening(np.concatenate((order[:keep], audited)), predicted, audited)
+
+    def record(self, screening, genomes, fitness_scores):
+        fitness = np.array([f[0] for f in fitness_scores], dtype=np.float64)
+        self.candidates += len(screening.predicted) if screening.predicted is not None else len(fitness)
+        self.simulated += len(fitness)
+        if screening.predicted is not None:
+            self.abs_error_sum += np.abs(screening.predicted[screening.simulate] - fitness).sum()
+            self.predictions += len(fitness)
+            kept = len(fitness) - len(screening.audited)
+            if len(screening.audited):
+                self.audits += len(screening.audited)
+                self.wrong_rejections += int((fitness[kept:] < fitness[:kept].max()).sum())
+        self.surrogate.update(genomes, fitness)
+
+    @property
+    def simulations_saved(self):
+        return self.candidates - self.simulated
+
+    def wrong_rate(self):
+        return self.wrong_rejections / self.audits if self.audits else 0.0
+
+    def mean_abs_error(self):
+        return self.abs_error_sum / self.predictions if self.predictions else 0.0
+
+    def clear(self):
+        self.surrogate.clear()
@@ -0,0 +1,51 @@
+from collections import OrderedDict
+
+
+# Bounded LRU map from (font, text, antialias, color) to the rendered surface. Each
+# entry is tagged with the theme that was active when it was rendered, so a theme's
+# text can be dropped in one go; use_theme() does that for the theme being left.
+# Cached surfaces are shared, so callers must only blit them, never draw on them.
+class TextCache:
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.theme_keys = {}
+        self.theme = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Same arguments as font.render, with the font first
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, tuple(color))
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.entries[key] = (surface, self.theme)
+        self.theme_keys.setdefault(self.theme, set()).add(key)
+        if len(self.entries) > self.max_entries:
+            old_key, (_, theme) = self.entries.popitem(last=False)
+            self.theme_keys[theme].discard(old_key)
+            self.evictions += 1
+        return surface
+
+    def use_theme(self, theme):
+        if theme != self.theme:
+            previous, self.theme = self.theme, theme
+            self.invalidate(previous)
+
+    def invalidate(self, theme):
+        for key in self.theme_keys.pop(theme, ()):
+            del self.entries[key]
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        self.entries.clear()
+        self.theme_keys.clear()
@@ -0,0 +1,81 @@
+import argparse
+import time
+
+import numpy as np
+
+from simulation import DIFFICULTIES
+from islands import IslandModel, TOPOLOGIES
+from optimizers import OPTIMIZERS
+from nsga2 import FRONT_MAX_TURNS, evolve_front
+from checkpoint import checkpoint_path, save_checkpoint, front_path, save_front
+
+
+# NSGA-II over the objective vector instead of the weighted fitness, for one
+# difficulty. The difficulty's preset is picked from the saved front when the game
+# starts, so changing preset weights needs no retraining. The front records the
+# difficulty and max_turns it was evolved at; the game only uses a front evolved at
+# its retraining horizon (FRONT_MAX_TURNS).
+def train_front(args):
+    max_turns = args.max_turns or FRONT_MAX_TURNS
+    started = time.monotonic()
+    front = evolve_front(args.difficulty, args.generations, args.population, args.rollouts, max_turns, args.seed)
+    print(f"Pareto front: {len(front)} genomes after {args.generations} generations "
+          f"({time.monotonic() - started:.1f} s)")
+    genome, fitness = front.preset(args.difficulty)
+    print(f"{args.difficulty} preset: fitness = {fitness:.3f}, behavior = {np.round(genome, 3).tolist()}")
+
+    if not args.no_save:
+        path = front_path(args.difficulty)
+        save_front(path, front.genomes, front.objectives, args.difficulty, max_turns)
+        print(f"Saved {len(front)} genomes to {path}")
+
+
+# Headless offline training. The kept population is written as the difficulty's
+# checkpoint, so the next game launch warm-starts from it.
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune enemy behaviors offline with an island model")
+    parser.add_argument("--difficulty", choices=list(DIFFICULTIES), default="Medium")
+    parser.add_argument("--optimizer", choices=list(OPTIMIZERS), default="ga")
+    parser.add_argument("--generations", type=int, default=50)
+    parser.add_argument("--islands", type=int, default=4)
+    parser.add_argument("--population", type=int, default=50, help="genomes per island")
+    parser.add_argument("--topology", choices=list(TOPOLOGIES), default="ring")
+    parser.add_argument("--migration-interval", type=int, default=5)
+    parser.add_argument("--migrants", type=int, default=2)
+    parser.add_argument("--rollouts", type=int, default=32, help="Monte Carlo rollouts per genome")
+    parser.add_argument("--max-turns", type=int, default=None,
+                        help=f"turns per simulated battle (default 5, or {FRONT_MAX_TURNS} with --pareto)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--keep", type=int, default=5, help="best genomes saved to the checkpoint")
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--pareto", action="store_true", help="evolve a Pareto front for the difficulty presets")
+    args = parser.parse_args(argv)
+
+    if args.pareto:
+        train_front(args)
+        return
+
+    model = IslandModel(
+        args.islands, args.population, args.topology, args.migration_interval, args.migrants,
+        args.difficulty, args.max_turns or 5, args.optimizer, "monte_carlo", args.seed, rollouts=args.rollouts
+    )
+    started = time.monotonic()
+    result = model.run(args.generations)
+    print(f"Seed: {model.seed}")
+    print(f"Best fitness = {result.best_fitness:.3f} after {args.generations} generations "
+          f"({time.monotonic() - started:.1f} s)")
+    print("Island bests: " + ", ".join(f"{f:.3f}" for f in result.island_best))
+    print(f"Best behavior: {np.round(result.best_behavior, 3).tolist()}")
+
+    if not args.no_save:
+        order = np.argsort(result.fitness_scores[:, 0])[:args.keep]
+        path = checkpoint_path(args.difficulty)
+        save_checkpoint(
+            path, result.population[order], result.best_behavior, result.best_fitness, args.generations,
+            result.fitness_scores[order].tolist()
+        )
+        print(f"Saved {len(order)} genomes to {path}")
+
+
+if __name__ == "__main__":
+    main()
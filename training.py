@@ -0,0 +1,138 @@
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from vector_ga import as_population
+
+GenerationResult = namedtuple("GenerationResult", "population fitness_scores incumbent_score")
+
+
+# One generation's fitness evaluation, done a chunk of genomes per step(). Genomes
+# play from a fresh battle, or from the BattleSnapshot `start` when one is given.
+# Batched backends (monte_carlo, racing) get the whole population in one step, since
+# they vectorize across it and racing can only eliminate genomes raced together;
+# serial and process backends get `workers` genomes per step so a FrameBudget can
+# stop between chunks.
+class GenerationRun:
+    def __init__(self, evaluator, population, difficulty, max_turns, seed, chunk=None, start=None):
+        self.evaluator = evaluator
+        self.population = population
+        self.difficulty = difficulty
+        self.max_turns = max_turns
+        self.seed = seed
+        self.chunk = chunk or (len(population) if evaluator.batched else evaluator.workers)
+        self.options = {} if start is None else {"start": start}
+        self.fitness_scores = []
+
+    def step(self):
+        first = len(self.fitness_scores)
+        batch = self.population[first:first + self.chunk]
+        self.fitness_scores.extend(
+            self.evaluator.evaluate(batch, self.difficulty, self.max_turns, self.seed, offset=first, **self.options)
+        )
+        return self.done()
+
+    def done(self):
+        return len(self.fitness_scores) >= len(self.population)
+
+    @property
+    def progress(self):
+        return len(self.fitness_scores) / len(self.population) if len(self.population) else 1.0
+
+
+# Runs step() repeatedly until it reports completion or the per-frame time budget
+# is spent. At least one step runs per call so training always makes progress.
+class FrameBudget:
+    def __init__(self, seconds=0.012, clock=time.monotonic):
+        self.seconds = seconds
+        self.clock = clock
+
+    def run(self, step):
+        deadline = self.clock() + self.seconds
+        finished = step()
+        while not finished and self.clock() < deadline:
+            finished = step()
+        return finished
+
+
+# Evaluation of one mid-battle generation of candidates. They are scored from a snapshot
+# of the live battle taken at submit time, so they are judged on the position the player
+# is actually in and the job never sees the battle change underneath it. Fitness from
+# one position says little about another, so the `incumbent` genome (the live best) is
+# scored along with the candidates and its score returned separately as the bar they
+# have to beat. The result goes back to the optimizer's tell() on the caller's thread.
+class RetrainJob:
+    def __init__(self, evaluator, population, battle, difficulty, max_turns, seed, incumbent=None):
+        population = as_population(population)
+        self.candidates = len(population)
+        if incumbent is not None:
+            population = np.concatenate((population, as_population([incumbent])))
+        self.run = GenerationRun(evaluator, population, difficulty, max_turns, seed, start=battle.snapshot())
+        self.cancelled = False
+
+    def step(self):
+        return self.run.step()
+
+    def finish(self):
+        n = self.candidates
+        incumbent_score = self.run.fitness_scores[n] if len(self.run.population) > n else None
+        return GenerationResult(self.run.population[:n], self.run.fitness_scores[:n], incumbent_score)
+
+    def run_to_end(self):
+        while not self.cancelled:
+            if self.step():
+                return self.finish()
+        return None
+
+
+# Mid-battle GA retraining that never blocks the frame loop. By default each generation
+# runs on a background thread; with a FrameBudget it is instead stepped from poll() for
+# at most that long per frame. submit() supersedes any unfinished job and cancel()
+# (e.g. on a difficulty change) drops it; poll() never hands out a stale result.
+class BackgroundTrainer:
+    def __init__(self, evaluator, budget=None):
+        self.evaluator = evaluator
+        self.budget = budget
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ga-retrain") if budget is None else None
+        self.job = None
+        self.future = None
+
+    def busy(self):
+        return self.job is not None
+
+    def progress(self):
+        return self.job.run.progress if self.job is not None else None
+
+    def submit(self, population, battle, difficulty, max_turns, seed, incumbent=None):
+        self.cancel()
+        self.job = RetrainJob(self.evaluator, population, battle, difficulty, max_turns, seed, incumbent)
+        if self.executor is not None:
+            self.future = self.executor.submit(self.job.run_to_end)
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancelled = True
+            self.job = None
+        if self.future is not None:
+            self.future.cancel()
+            self.future = None
+
+    def poll(self):
+        if self.job is None:
+            return None
+        if self.executor is None:
+            if not self.budget.run(self.job.step):
+                return None
+            job, self.job = self.job, None
+            return job.finish()
+        if not self.future.done():
+            return None
+        future, self.future, self.job = self.future, None, None
+        return future.result()
+
+    def close(self):
+        self.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,70 @@
+import numpy as np
+
+from simulation import DIFFICULTIES, ATTACK, HEAL
+
+# Array counterparts of the GA functions in simulation.py. A population is a float
+# array of shape (pop_size, n_enemies, 4), and every operator works on the whole
+# population at once, so breeding costs a handful of NumPy calls at any size.
+
+
+def as_population(population):
+    population = np.array(population, dtype=np.float64)
+    return population.reshape(len(population), -1, 4)
+
+
+def random_population(size, num_enemies, difficulty="Medium", rng=None):
+    rng = np.random.default_rng(rng)
+    adjust = DIFFICULTIES[difficulty]
+    low = np.array([0.5, 0.2, 0.2, 0.0])
+    high = np.array([0.9, 0.4, 0.6, 0.2])
+    offset = np.array([adjust["attack_prob_adjust"], adjust["heal_prob_adjust"], 0.0, adjust["special_prob_adjust"]])
+    return rng.uniform(low, high, (size, num_enemies, 4)) + offset
+
+
+# Indices of `count` tournament winners (lowest score) among `size` entrants each.
+# Entrants are drawn with replacement, unlike tournament_select's random.sample.
+def tournament_select(scores, count, rng, size=3):
+    scores = np.asarray(scores, dtype=np.float64)
+    entrants = rng.integers(0, len(scores), (count, size))
+    return entrants[np.arange(count), scores[entrants].argmin(axis=1)]
+
+
+def crossover(parents1, parents2, rng):
+    return np.where(rng.random(parents1.shape) < 0.5, parents1, parents2)
+
+
+# The history-driven part of mutate(), worked out once per generation from the battle
+# (or anything with the same player_action_history and enemies). None means no history.
+def mutation_bias(battle):
+    history = battle.player_action_history
+    if not len(history):
+        return None
+    heal_ratio = history.count(HEAL) / len(history)
+    attack_ratio = history.count(ATTACK) / len(history)
+    return np.array([
+        0.1 if attack_ratio > 0.5 else -0.1,
+        0.05 if any(e.hp / e.max_hp < 0.5 for e in battle.enemies if e.alive) else 0,
+        0.0,
+        0.1 if heal_ratio > 0.5 else -0.1
+    ])
+
+
+def mutate(population, bias, rng, scale=0.02):
+    noise = rng.uniform(-scale, scale, population.shape)
+    if bias is None:
+        return np.clip(population + noise, 0, 1)
+    jitter = np.zeros(population.shape)
+    jitter[..., 2] = rng.uniform(-0.02, 0.02, population.shape[:-1])
+    return np.clip(population + bias + jitter + noise, 0, 1)
+
+
+# Elitism plus tournament selection, uniform crossover and mutation, as in breed().
+# The new population has `size` genomes, by default as many as were given.
+def breed(population, fitness_scores, elite, bias, rng, size=None):
+    population = as_population(population)
+    scores = [f[0] for f in fitness_scores]
+    count = (size or len(population)) - 1
+    parents1 = population[tournament_select(scores, count, rng)]
+    parents2 = population[tournament_select(scores, count, rng)]
+    children = mutate(crossover(parents1, parents2, rng), bias, rng)
+    return np.concatenate((np.asarray(elite, dtype=np.float64)[None], children))